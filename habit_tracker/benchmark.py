@@ -0,0 +1,324 @@
+"""
+Synthetic data generator and benchmark suite for logic and db_manager.
+
+Usage:
+    python -m habit_tracker.benchmark run --habits 500 --years 3 --output results.json
+    python -m habit_tracker.benchmark compare baseline.json results.json --threshold 0.1
+"""
+import json
+import platform
+import random
+import sqlite3
+import statistics
+import tempfile
+import time
+from datetime import date, datetime, timedelta
+from pathlib import Path
+
+import click
+
+from . import db_manager, logic
+from .history import CompletionHistory
+
+
+def generate_database(path, habits: int = 100, years: float = 1.0, density: float = 0.7,
+                      archived_ratio: float = 0.1, seed: int = 0):
+    """
+    Creates a habit database at `path` filled with synthetic data.
+    Each habit is created up to `years` ago and completed on each day since with
+    probability `density`; about `archived_ratio` of the habits are archived.
+    """
+    rng = random.Random(seed)
+    db_manager.set_db_path(path)
+    db_manager.init_db()
+
+    today = date.today()
+    max_days = int(years * 365)
+    with db_manager.db_session() as conn:
+        for number in range(habits):
+            created = today - timedelta(days=rng.randint(0, max_days))
+            status = 'archived' if rng.random() < archived_ratio else 'active'
+            cursor = conn.execute(
+                "INSERT INTO habits (name, description, created_at, status) VALUES (?, ?, ?, ?)",
+                (f"Habit {number + 1}", "synthetic", f"{created.isoformat()} 08:00:00", status)
+            )
+            days = (today - created).days + 1
+            conn.executemany(
+                "INSERT INTO completions (habit_id, completed_at) VALUES (?, ?)",
+                [(cursor.lastrowid, (created + timedelta(days=offset)).isoformat())
+                 for offset in range(days) if rng.random() < density]
+            )
+    db_manager.rebuild_habit_stats()
+
+
+def _time(func, repeat: int) -> dict:
+    """Runs func `repeat` times and returns timing statistics in seconds."""
+    runs = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        runs.append(time.perf_counter() - start)
+    return {'min': min(runs), 'median': statistics.median(runs), 'max': max(runs), 'runs': repeat}
+
+
+# The statements one 'habit done' issues after connecting, run against the first habit.
+# The writes are rolled back, so timing them leaves the database unchanged.
+DONE_STATEMENTS = (
+    "PRAGMA user_version",
+    "SELECT id, name, created_day FROM habits WHERE status = 'active' ORDER BY created_at, id LIMIT 1",
+    "BEGIN IMMEDIATE",
+    "INSERT OR IGNORE INTO completions (habit_id, completed_at) VALUES (:habit_id, :day)",
+    "SELECT * FROM habit_stats WHERE habit_id = :habit_id",
+    "SELECT completed_day FROM completions WHERE habit_id = :habit_id",
+    "INSERT OR REPLACE INTO habit_stats (habit_id, total_completions, run_start, run_end, longest_streak) "
+    "SELECT habit_id, total_completions, run_start, run_end, longest_streak FROM habit_stats WHERE habit_id = :habit_id",
+    "UPDATE db_state SET write_count = write_count + 1",
+    "ROLLBACK",
+)
+
+
+def _done_statements(habit_id: int, shared: bool):
+    """
+    Runs DONE_STATEMENTS over the process-wide connection, or like the original
+    per-call connections: each statement on a freshly opened and tuned connection,
+    with each write in its own transaction.
+    """
+    params = {'habit_id': habit_id, 'day': date.today().isoformat()}
+    if shared:
+        conn = db_manager.get_db_connection()
+        for sql in DONE_STATEMENTS:
+            conn.execute(sql, params).fetchall()
+        return
+
+    for sql in DONE_STATEMENTS:
+        if sql in ("BEGIN IMMEDIATE", "ROLLBACK"):
+            continue
+        conn = db_manager.get_db_connection()
+        writes = not sql.startswith(("SELECT", "PRAGMA"))
+        if writes:
+            conn.execute("BEGIN IMMEDIATE")
+        conn.execute(sql, params).fetchall()
+        if writes:
+            conn.execute("ROLLBACK")
+        db_manager.close_db_connection()
+
+
+def run_benchmarks(repeat: int = 5, output_dir=None, jobs: int = 1) -> dict:
+    """
+    Times the report pipelines against the current database.
+    With jobs > 1 the parallel summary is timed as well.
+    """
+    from .cli import SUMMARY_TEMPLATE_FIELDS, SUMMARY_TERMINAL_FIELDS, GAPS_PER_PAGE, render_summary_html
+
+    output_dir = Path(output_dir or tempfile.mkdtemp())
+    today = date.today()
+    habits = db_manager.get_habits(status='all')
+    completions_by_habit = db_manager.get_completions_by_habit(status='all')
+    dates_by_habit = {habit_id: [date.fromisoformat(d) for d in completions]
+                      for habit_id, completions in completions_by_habit.items()}
+
+    def streaks_python():
+        for dates in dates_by_habit.values():
+            logic.calculate_streak(dates)
+            logic.calculate_longest_streak(dates)
+
+    def streaks_bitset():
+        for habit in habits:
+            created = date.fromordinal(habit['created_day'])
+            history = CompletionHistory.from_dates(dates_by_habit.get(habit['id'], []), created)
+            history.current_streak(today)
+            history.longest_streak()
+
+    def summary_html(jobs=1):
+        context = logic.get_summary_data(fields=SUMMARY_TEMPLATE_FIELDS["summary.html"], lazy=True, jobs=jobs)
+        context.update(max_gaps=100, gaps_per_page=GAPS_PER_PAGE)
+        render_summary_html(context, output_dir / "habit_summary.html")
+
+    habit_id = habits[0]['id'] if habits else 0
+
+    benchmarks = {
+        'connection[shared]': lambda: _done_statements(habit_id, shared=True),
+        'connection[per-statement]': lambda: _done_statements(habit_id, shared=False),
+        'get_enriched_habits_data': lambda: logic.get_enriched_habits_data(status='active'),
+        'get_summary_data[terminal]': lambda: logic.get_summary_data(fields=SUMMARY_TERMINAL_FIELDS),
+        'get_summary_data[html]': lambda: logic.get_summary_data(fields=SUMMARY_TEMPLATE_FIELDS["summary.html"]),
+        'streaks[python]': streaks_python,
+        'streaks[bitset]': streaks_bitset,
+        'streaks[sql]': lambda: db_manager.get_habit_analytics(status='all'),
+        'summary_html': summary_html,
+    }
+    if jobs > 1:
+        benchmarks[f'get_summary_data[html,jobs={jobs}]'] = lambda: logic.get_summary_data(
+            fields=SUMMARY_TEMPLATE_FIELDS["summary.html"], jobs=jobs
+        )
+        benchmarks[f'summary_html[jobs={jobs}]'] = lambda: summary_html(jobs=jobs)
+    return {name: _time(func, repeat) for name, func in benchmarks.items()}
+
+
+def _stress_worker(db_path: str, pairs: list[tuple[int, str]], defer: bool) -> int:
+    """Writes each (habit id, day) completion on its own, like a separate 'habit done'; returns the errors."""
+    db_manager.set_db_path(db_path)
+    write = db_manager.defer_completions if defer else db_manager.add_completions
+    errors = 0
+    for habit_id, day in pairs:
+        try:
+            write([habit_id], [date.fromisoformat(day)])
+        except sqlite3.Error:
+            errors += 1
+    db_manager.close_db_connection()
+    return errors
+
+
+def run_stress(path, processes: int = 16, writes: int = 200, habits: int = 5,
+               days: int = 60, defer: bool = False, seed: int = 0) -> dict:
+    """
+    Has `processes` worker processes record `writes` completions each at the same time,
+    drawn from an overlapping pool of habits and days so that many writes collide.
+    :return: Counts showing whether any completion was lost or duplicated.
+    """
+    rng = random.Random(seed)
+    db_manager.set_db_path(path)
+    db_manager.init_db()
+    for number in range(habits):
+        db_manager.add_habit(f"Stress {number + 1}")
+    habit_ids = [habit['id'] for habit in db_manager.get_habits(status='active')]
+    today = date.today()
+    pool = [(habit_id, (today - timedelta(days=offset)).isoformat())
+            for habit_id in habit_ids for offset in range(days)]
+    batches = [[rng.choice(pool) for _ in range(writes)] for _ in range(processes)]
+    expected = {pair for batch in batches for pair in batch}
+
+    start = time.perf_counter()
+    with db_manager.process_pool(processes) as executor:
+        errors = sum(executor.map(_stress_worker, [str(path)] * processes, batches, [defer] * processes))
+    db_manager.merge_pending_writes()
+    elapsed = time.perf_counter() - start
+
+    conn = db_manager.get_db_connection()
+    stored = {(row['habit_id'], row['completed_at'])
+              for row in conn.execute("SELECT habit_id, completed_at FROM completions")}
+    rows = conn.execute("SELECT COUNT(*) FROM completions").fetchone()[0]
+    return {
+        'writes': processes * writes,
+        'seconds': elapsed,
+        'errors': errors,
+        'expected': len(expected),
+        'stored': rows,
+        'lost': len(expected - stored),
+        'duplicated': rows - len(stored),
+        'unexpected': len(stored - expected),
+        'stats_mismatches': len(db_manager.rebuild_habit_stats()),
+    }
+
+
+def compare_results(baseline: dict, current: dict) -> list[tuple[str, float, float, float]]:
+    """
+    Compares the median timings of two result files.
+    :return: (name, baseline median, current median, relative change) for every benchmark in both.
+    """
+    rows = []
+    for name, result in current['results'].items():
+        if name in baseline['results']:
+            before = baseline['results'][name]['median']
+            after = result['median']
+            change = (after - before) / before if before else 0.0
+            rows.append((name, before, after, change))
+    return rows
+
+
+@click.group()
+def bench():
+    """Benchmarks for the habit tracker's data and report pipelines."""
+    pass
+
+
+@bench.command()
+@click.option('--habits', default=200, show_default=True, help="Number of habits to generate.")
+@click.option('--years', default=2.0, show_default=True, help="Maximum age of a habit in years.")
+@click.option('--density', default=0.7, show_default=True, help="Probability a habit is done on a given day.")
+@click.option('--archived-ratio', default=0.1, show_default=True, help="Fraction of archived habits.")
+@click.option('--repeat', default=5, show_default=True, help="Runs per benchmark.")
+@click.option('--seed', default=0, show_default=True, help="Random seed for the synthetic data.")
+@click.option('--jobs', default=1, show_default=True, help="Also time the parallel summary with this many workers.")
+@click.option('--db', 'db_path', type=click.Path(dir_okay=False), default=None,
+              help="Reuse or create the synthetic database at this path.")
+@click.option('--output', type=click.Path(dir_okay=False), default=None, help="Write results as JSON to this file.")
+def run(habits, years, density, archived_ratio, repeat, seed, jobs, db_path, output):
+    """Generates a synthetic database and times the report pipelines on it."""
+    workdir = Path(tempfile.mkdtemp(prefix="habit-bench-"))
+    db_path = Path(db_path) if db_path else workdir / "habits.db"
+
+    if db_path.exists():
+        db_manager.set_db_path(db_path)
+        db_manager.init_db()
+    else:
+        click.echo(f"Generating {habits} habits over {years} years at {db_path}...", err=True)
+        generate_database(db_path, habits, years, density, archived_ratio, seed)
+
+    results = run_benchmarks(repeat=repeat, output_dir=workdir, jobs=jobs)
+    report = {
+        'meta': {
+            'created': datetime.now().isoformat(timespec='seconds'),
+            'python': platform.python_version(),
+            'sqlite': sqlite3.sqlite_version,
+            'params': {'habits': habits, 'years': years, 'density': density,
+                       'archived_ratio': archived_ratio, 'repeat': repeat, 'seed': seed, 'jobs': jobs},
+        },
+        'results': results,
+    }
+
+    for name, result in results.items():
+        click.echo(f"{name:<28} median {result['median'] * 1000:10.2f} ms   min {result['min'] * 1000:10.2f} ms", err=True)
+
+    if output:
+        Path(output).write_text(json.dumps(report, indent=2))
+        click.echo(f"Results written to {output}", err=True)
+    else:
+        click.echo(json.dumps(report, indent=2))
+
+
+@bench.command()
+@click.argument('baseline', type=click.Path(exists=True, dir_okay=False))
+@click.argument('current', type=click.Path(exists=True, dir_okay=False))
+@click.option('--threshold', default=0.10, show_default=True,
+              help="Relative median slowdown that counts as a regression.")
+def compare(baseline, current, threshold):
+    """Compares two result files and exits non-zero if anything slowed down past the threshold."""
+    rows = compare_results(json.loads(Path(baseline).read_text()), json.loads(Path(current).read_text()))
+
+    regressions = 0
+    for name, before, after, change in rows:
+        flag = ""
+        if change > threshold:
+            flag = "  REGRESSION"
+            regressions += 1
+        click.echo(f"{name:<28} {before * 1000:10.2f} ms -> {after * 1000:10.2f} ms  {change:+7.1%}{flag}")
+
+    if regressions:
+        raise click.ClickException(f"{regressions} benchmark(s) slowed down by more than {threshold:.0%}")
+
+
+@bench.command()
+@click.option('--processes', default=16, show_default=True, help="Number of concurrent writer processes.")
+@click.option('--writes', default=200, show_default=True, help="Completions recorded by each process.")
+@click.option('--habits', default=5, show_default=True, help="Habits the completions are spread over.")
+@click.option('--days', default=60, show_default=True, help="Days the completions are spread over.")
+@click.option('--defer', is_flag=True, help="Write through the pending-writes journal like 'habit done --defer'.")
+@click.option('--seed', default=0, show_default=True, help="Random seed for the writes.")
+def stress(processes, writes, habits, days, defer, seed):
+    """Writes completions from many processes at once and checks none were lost or duplicated."""
+    db_path = Path(tempfile.mkdtemp(prefix="habit-stress-")) / "habits.db"
+    result = run_stress(db_path, processes, writes, habits, days, defer, seed)
+
+    click.echo(f"{result['writes']} writes from {processes} processes in {result['seconds']:.2f} s "
+               f"({result['writes'] / result['seconds']:.0f} writes/s)", err=True)
+    for name in ('errors', 'expected', 'stored', 'lost', 'duplicated', 'unexpected', 'stats_mismatches'):
+        click.echo(f"{name:<18} {result[name]}", err=True)
+
+    failures = result['errors'] + result['lost'] + result['duplicated'] + result['unexpected'] + result['stats_mismatches']
+    if failures or result['stored'] != result['expected']:
+        raise click.ClickException("Concurrent writes lost, duplicated or corrupted completions")
+
+
+if __name__ == '__main__':
+    bench()
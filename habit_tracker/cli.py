@@ -1,30 +1,86 @@
 import click
-from datetime import date
-from rich.console import Console
-from rich.table import Table
+import itertools
+import os
+import time
+from datetime import date, timedelta
 from pathlib import Path
-from . import db_manager, logic
-from jinja2 import Environment, FileSystemLoader
-import webbrowser
+from . import db_manager, heatmap, logic, profiling, transfer
 
-console = Console()
+# Rich, Jinja2 and webbrowser are imported inside the commands that use them,
+# so quick commands like 'habit done' start without loading them.
 
-def _get_active_habits_with_display_ids():
-    """Helper to get active habits and a map from display ID to db ID."""
-    active_habits = logic.get_enriched_habits_data(status='active')
-    id_map = {i + 1: habit['id'] for i, habit in enumerate(active_habits)}
-    return active_habits, id_map
+class _LazyConsole:
+    """Stands in for a Rich Console and only creates (and imports) it on first use."""
+    _console = None
 
-def _get_archived_habits_with_display_ids():
-    """Helper to get archived habits and a map from display ID to db ID."""
-    archived_habits = logic.get_enriched_habits_data(status='archived')
-    id_map = {i + 1: habit['id'] for i, habit in enumerate(archived_habits)}
-    return archived_habits, id_map
+    def __getattr__(self, name):
+        if _LazyConsole._console is None:
+            from rich.console import Console
+            _LazyConsole._console = Console()
+        return getattr(_LazyConsole._console, name)
+
+console = _LazyConsole()
+
+# Summary fields each report needs (see logic.SUMMARY_FIELDS); nothing else is computed
+SUMMARY_TEMPLATE_FIELDS = {
+    "summary.html": ('current_streak', 'longest_streak', 'completion_rate',
+                     'total_completions', 'heatmap', 'missed_ranges', 'missed_days'),
+}
+SUMMARY_TERMINAL_FIELDS = ('period', 'current_streak', 'longest_streak', 'total_checks', 'total_possible')
+
+# Set to any value to compute every report from the database instead of the stats cache
+NO_CACHE_ENV_VAR = "HABIT_NO_CACHE"
+
+def _resolve_display_id(display_id, status='active'):
+    """Helper to map a display ID from 'habit list' to the habit's db row (id and name)."""
+    return db_manager.get_habit_by_position(status, display_id)
 
 @click.group()
-def cli():
+@click.option('--db', 'db_path', type=click.Path(dir_okay=False), default=None,
+              help="Use this database file instead of ~/.habit-cli/habits.db (or $HABIT_DB).")
+@click.option('--startup-profile', is_flag=True, help="Report import, init and command timings on exit.")
+@click.option('--profile', is_flag=True, help="Report time per phase and the SQL queries issued on exit.")
+@click.pass_context
+def cli(ctx, db_path, startup_profile, profile):
     """A CLI tool to track your daily habits."""
-    pass
+    timings = ctx.obj if isinstance(ctx.obj, dict) else {}
+    if db_path:
+        db_manager.set_db_path(db_path)
+    if startup_profile:
+        ctx.call_on_close(lambda: _print_startup_profile(timings))
+    if profile or profiling.trace_requested():
+        profiling.enable()
+        # Reopen the database connection so that its statements are traced from now on
+        db_manager.close_db_connection()
+        ctx.call_on_close(lambda: _report_profile(ctx.invoked_subcommand or "", profile))
+
+    # Ensure the database schema is current before running any command (a no-op once it is)
+    init_start = time.perf_counter()
+    db_manager.init_db()
+    timings['init_db'] = time.perf_counter() - init_start
+    timings['command_start'] = time.perf_counter()
+    if not os.environ.get(NO_CACHE_ENV_VAR):
+        logic.enable_snapshot_cache()
+    if ctx.invoked_subcommand != 'done':
+        # Fold completions recorded with 'done --defer' into the database before reading it
+        db_manager.merge_pending_writes()
+
+def _report_profile(command, print_breakdown):
+    """Prints the profiling breakdown and/or dumps it as JSON for HABIT_TRACE."""
+    report = profiling.get_report(command)
+    if print_breakdown:
+        profiling.print_report(report)
+    if profiling.trace_requested():
+        profiling.dump_trace(report)
+
+def _print_startup_profile(timings):
+    """Prints the import (from __main__) and init_db timings plus the time spent in the command."""
+    started = timings.get('command_start')
+    if started is not None:
+        timings['command'] = time.perf_counter() - started
+    for phase in ('imports', 'init_db', 'command'):
+        if phase in timings:
+            click.echo(f"{phase:>8}: {timings[phase] * 1000:8.2f} ms", err=True)
 
 @cli.command(name="list")
 @click.option('--archived', is_flag=True, help="List archived habits instead of active ones.")
@@ -37,22 +93,24 @@ def list_habits(archived):
         console.print(f"No {status} habits found. Use 'habit add' to create one!", style="yellow")
         return
 
-    table = Table(title=f"{status.capitalize()} Habits", show_header=True, header_style="bold magenta")
-    table.add_column("ID", style="dim", width=4)
-    table.add_column("Habit Name", min_width=20)
-    table.add_column("Streak", justify="right")
-    table.add_column("Completed Today?", justify="center")
-
-    for idx, habit in enumerate(habits_data):
-        status_emoji = "✅" if habit['done_today'] else "❌"
-        streak_color = "green" if habit['streak'] > 0 else "default"
-        table.add_row(
-            str(idx + 1),
-            habit['name'],
-            f"[{streak_color}]{habit['streak']}[/{streak_color}]",
-            status_emoji
-        )
-    console.print(table)
+    with profiling.phase("render.list_habits"):
+        from rich.table import Table
+        table = Table(title=f"{status.capitalize()} Habits", show_header=True, header_style="bold magenta")
+        table.add_column("ID", style="dim", width=4)
+        table.add_column("Habit Name", min_width=20)
+        table.add_column("Streak", justify="right")
+        table.add_column("Completed Today?", justify="center")
+
+        for idx, habit in enumerate(habits_data):
+            status_emoji = "✅" if habit['done_today'] else "❌"
+            streak_color = "green" if habit['streak'] > 0 else "default"
+            table.add_row(
+                str(idx + 1),
+                habit['name'],
+                f"[{streak_color}]{habit['streak']}[/{streak_color}]",
+                status_emoji
+            )
+        console.print(table)
 
 
 @cli.command()
@@ -66,17 +124,64 @@ def add(name, description):
 
 
 @cli.command()
-@click.argument('display_id', type=int)
-def done(display_id):
-    """Marks a habit as done for today."""
-    _, id_map = _get_active_habits_with_display_ids()
-    if display_id not in id_map:
-        console.print("Error: Invalid ID.", style="bold red")
+@click.argument('display_ids', type=int, nargs=-1, required=True)
+@click.option('--date', 'on_date', type=click.DateTime(formats=["%Y-%m-%d"]), default=None,
+              help="Mark the habits done on this day (YYYY-MM-DD) instead of today.")
+@click.option('--from', 'from_date', type=click.DateTime(formats=["%Y-%m-%d"]), default=None,
+              help="Backfill every day from this date (YYYY-MM-DD)...")
+@click.option('--to', 'to_date', type=click.DateTime(formats=["%Y-%m-%d"]), default=None,
+              help="...until this date (YYYY-MM-DD, defaults to today).")
+@click.option('-q', '--quiet', is_flag=True, help="Don't print a confirmation or the habit list afterwards.")
+@click.option('--defer', is_flag=True,
+              help="Append to the pending-writes journal instead of waiting for the database (for scripts).")
+def done(display_ids, on_date, from_date, to_date, quiet, defer):
+    """Marks one or more habits as done for today (or other days)."""
+    today = date.today()
+    if on_date and (from_date or to_date):
+        console.print("Error: Use either --date or --from/--to, not both.", style="bold red")
         return
-    
-    db_id = id_map[display_id]
-    db_manager.add_completion(db_id, date.today())
-    console.print("Great job! Habit marked as done for today.", style="green")
+    if to_date and not from_date:
+        console.print("Error: --to needs a --from date.", style="bold red")
+        return
+
+    if from_date:
+        first, last = from_date.date(), (to_date.date() if to_date else today)
+    else:
+        first = last = on_date.date() if on_date else today
+    if first > last:
+        console.print("Error: --from must not be after --to.", style="bold red")
+        return
+    if last > today:
+        console.print("Error: Habits can't be marked done in the future.", style="bold red")
+        return
+
+    # Resolve every display ID with one query before writing anything
+    habits = db_manager.get_habits_by_positions('active', list(display_ids))
+    invalid = [str(display_id) for display_id in display_ids if display_id not in habits]
+    if invalid:
+        console.print(f"Error: Invalid ID: {', '.join(invalid)}.", style="bold red")
+        return
+
+    habit_ids = list(dict.fromkeys(habit['id'] for habit in habits.values()))
+    days = [first + timedelta(days=offset) for offset in range((last - first).days + 1)]
+    if defer:
+        db_manager.defer_completions(habit_ids, days)
+        if not quiet:
+            console.print(f"Queued {len(habit_ids) * len(days)} completion(s).", style="green")
+        return
+
+    db_manager.merge_pending_writes()
+    added = db_manager.add_completions(habit_ids, days)
+
+    if quiet:
+        return
+    if len(habit_ids) == 1 and days == [today]:
+        console.print("Great job! Habit marked as done for today.", style="green")
+    else:
+        console.print(
+            f"Great job! Marked {len(habit_ids)} habit(s) done on {len(days)} day(s) "
+            f"({added} new completions).", style="green"
+        )
     list_habits.callback(archived=False)
 
 
@@ -84,12 +189,12 @@ def done(display_id):
 @click.argument('display_id', type=int)
 def archive(display_id):
     """Archives an active habit."""
-    _, id_map = _get_active_habits_with_display_ids()
-    if display_id not in id_map:
+    habit = _resolve_display_id(display_id, 'active')
+    if habit is None:
         console.print("Error: Invalid ID.", style="bold red")
         return
     
-    db_id = id_map[display_id]
+    db_id = habit['id']
     db_manager.update_habit_status(db_id, 'archived')
     console.print("Habit archived.", style="yellow")
     list_habits.callback(archived=False)
@@ -99,12 +204,12 @@ def archive(display_id):
 @click.argument('display_id', type=int)
 def unarchive(display_id):
     """Restores an archived habit to active."""
-    _, id_map = _get_archived_habits_with_display_ids()
-    if display_id not in id_map:
+    habit = _resolve_display_id(display_id, 'archived')
+    if habit is None:
         console.print("Error: Invalid ID.", style="bold red")
         return
     
-    db_id = id_map[display_id]
+    db_id = habit['id']
     db_manager.update_habit_status(db_id, 'active')
     console.print("Habit restored to active.", style="green")
     list_habits.callback(archived=True)
@@ -114,90 +219,192 @@ def unarchive(display_id):
 @click.argument('display_id', type=int)
 def delete(display_id):
     """Deletes a habit permanently."""
-    active_habits, active_id_map = _get_active_habits_with_display_ids()
-    archived_habits, archived_id_map = _get_archived_habits_with_display_ids()
-    
-    db_id = None
-    habit_name = ""
-    if display_id in active_id_map:
-        db_id = active_id_map[display_id]
-        habit_name = active_habits[display_id - 1]['name']
-    elif display_id in archived_id_map:
-        db_id = archived_id_map[display_id]
-        habit_name = archived_habits[display_id - 1]['name']
-
-    if not db_id:
+    # Active habits take precedence; the archived list is only consulted if needed
+    habit = _resolve_display_id(display_id, 'active') or _resolve_display_id(display_id, 'archived')
+
+    if habit is None:
         console.print("Error: Invalid ID. Check `list` or `list --archived`.", style="bold red")
         return
+
+    db_id = habit['id']
+    habit_name = habit['name']
     
     if click.confirm(f"Are you sure you want to permanently delete '[bold red]{habit_name}[/bold red]'?"):
         db_manager.delete_habit(db_id)
         console.print(f"Habit '[bold red]{habit_name}[/bold red]' deleted.", style="yellow")
 
 
+# Lines of 'habit history' output printed at a time, so long histories stream
+HISTORY_LINES_PER_PRINT = 200
+
+def _print_streamed(lines):
+    """Prints lines in batches as they are produced, never holding the whole output."""
+    batch = []
+    for line in lines:
+        batch.append(line)
+        if len(batch) == HISTORY_LINES_PER_PRINT:
+            console.print("\n".join(batch), highlight=False)
+            batch.clear()
+    if batch:
+        console.print("\n".join(batch), highlight=False)
+
 @cli.command()
 @click.argument('display_id', type=int)
-def history(display_id):
+@click.option('--archived', is_flag=True, help="DISPLAY_ID is an ID from 'habit list --archived'.")
+@click.option('--since', type=click.DateTime(formats=["%Y-%m-%d"]), default=None,
+              help="Only show completions on or after this date (YYYY-MM-DD).")
+@click.option('--until', type=click.DateTime(formats=["%Y-%m-%d"]), default=None,
+              help="Only show completions on or before this date (YYYY-MM-DD).")
+@click.option('--limit', type=click.IntRange(min=1), default=None,
+              help="Show at most this many entries, newest first.")
+@click.option('--by', 'period', type=click.Choice(['week', 'month']), default=None,
+              help="Show completions per week or month instead of every day.")
+def history(display_id, archived, since, until, limit, period):
     """Shows the completion history for a habit."""
-    active_habits, active_id_map = _get_active_habits_with_display_ids()
-    db_id = active_id_map.get(display_id)
+    status = 'archived' if archived else 'active'
+    habit = _resolve_display_id(display_id, status)
 
-    if not db_id:
+    if habit is None:
         console.print("Error: Invalid ID.", style="bold red")
         return
+    since = since.date() if since else None
+    until = until.date() if until else None
+    if since and until and since > until:
+        console.print("Error: --since must not be after --until.", style="bold red")
+        return
 
-    habit_name = active_habits[display_id - 1]['name']
-    completions = db_manager.get_completions(db_id)
-    
-    if not completions:
+    habit_name = habit['name']
+    completions = db_manager.iter_completions(habit['id'], since=since, until=until,
+                                              limit=None if period or limit is None else limit + 1)
+    first = next(completions, None)
+    if first is None and not period:
         console.print(f"No history found for '[bold cyan]{habit_name}[/bold cyan]'.", style="yellow")
         return
-        
-    table = Table(title=f"Completion History for '{habit_name}'")
-    table.add_column("Date", style="cyan")
-    
-    for comp_date in completions:
-        table.add_row(comp_date)
-        
-    console.print(table)
 
+    completions = itertools.chain([first] if first else [], completions)
+    if period:
+        console.print(f"Completions per {period} for '[bold cyan]{habit_name}[/bold cyan]'", style="bold")
+        last_day = min(until or date.today(), date.today())
+        first_day = since or date.fromordinal(habit['first_day'])
+        rows = logic.iter_history_rollup(completions, period, first_day, last_day)
+        _print_streamed(
+            f"{label:<9} {completed:>3}/{days:<3} {'█' * completed}{'·' * max(days - completed, 0)}"
+            for label, completed, days in itertools.islice(rows, limit)
+        )
+        return
 
+    console.print(f"Completion History for '[bold cyan]{habit_name}[/bold cyan]'", style="bold")
+    _print_streamed(f"{day}  {date.fromisoformat(day):%a}" for day in itertools.islice(completions, limit))
+
+    # The extra entry fetched beyond --limit is where the next page starts
+    next_day = next(completions, None) if limit else None
+    if next_day:
+        console.print(f"More entries: use --until {next_day} to continue.", style="dim")
+
+
+
+# Number of missed-day ranges shown per collapsible page of the HTML report
+GAPS_PER_PAGE = 25
+
+# The Jinja2 environment, created on first use and kept for the rest of the process
+_template_env = None
+
+def _get_template_env():
+    """
+    Returns the Jinja2 environment for the report templates.
+    Compiled templates are cached on disk, so later runs skip template compilation.
+    """
+    global _template_env
+    if _template_env is None:
+        from jinja2 import Environment, FileSystemBytecodeCache, FileSystemLoader, select_autoescape
+        template_dir = Path(__file__).resolve().parent.parent / "templates"
+        cache_dir = db_manager.DB_DIR / "template-cache"
+        cache_dir.mkdir(parents=True, exist_ok=True)
+        # Habit names, file names and error messages are escaped. The cached bytecode
+        # does not record that setting, so these files are kept apart from unescaped ones.
+        _template_env = Environment(
+            loader=FileSystemLoader(template_dir),
+            bytecode_cache=FileSystemBytecodeCache(str(cache_dir), pattern="__jinja2_escaped_%s.cache"),
+            autoescape=select_autoescape(['html']),
+        )
+        _template_env.filters['heatmap_cells'] = _heatmap_cells
+    return _template_env
+
+# Markup of one heatmap cell per status character (see heatmap.py)
+_HEATMAP_CELLS = str.maketrans({status: f'<i class="{status}"></i>' for status in 'cmbfo'})
+
+def _heatmap_cells(statuses: str):
+    """Template filter turning a habit's heatmap status string into its grid cells in one pass."""
+    from markupsafe import Markup
+    return Markup(statuses.translate(_HEATMAP_CELLS))
+
+def render_summary_html(context, output_path):
+    """
+    Renders summary.html with the given context and streams it into output_path.
+    context['habits'] may be a generator; each habit is rendered as it is produced.
+    """
+    with profiling.phase("render.template_load"):
+        template = _get_template_env().get_template("summary.html")
+    
+    # Stream the rendered template to the file in chunks instead of building one string
+    with profiling.phase("render.summary_html"):
+        stream = template.stream(**context)
+        stream.enable_buffering(size=20)
+        with open(output_path, "w", encoding="utf-8") as f:
+            stream.dump(f)
 
 @cli.command(name="summary-html")
-def summary_html():
+@click.option('--max-gaps', type=click.IntRange(min=0), default=100, show_default=True,
+              help="Most recent missed-day ranges to list per habit (0 for all).")
+@click.option('--jobs', '-j', type=click.IntRange(min=1), default=1, show_default=True,
+              help="Worker processes used to compute the per-habit statistics.")
+@click.option('--range', 'heatmap_range', default=logic.DEFAULT_HEATMAP_RANGE, show_default=True,
+              help="Period the heatmaps cover, ending today: e.g. 90d, 12w, 6m or 2y.")
+def summary_html(max_gaps, jobs, heatmap_range):
     """Generates an HTML summary report of your habits."""
+    try:
+        heatmap.parse_range(heatmap_range, date.today())
+    except ValueError as error:
+        raise click.BadParameter(str(error), param_hint="'--range'")
     console.print("Generating HTML summary...", style="cyan")
 
     # 1. Prepare data using the NEW master function
-    context = logic.get_summary_data() # This now returns the full context dictionary
-    
-    # 2. Set up Jinja2 (no changes here)
-    template_dir = Path(__file__).resolve().parent.parent / "templates"
-    env = Environment(loader=FileSystemLoader(template_dir))
-    template = env.get_template("summary.html")
-    
-    # 3. Render the template by unpacking the context dictionary
-    html_output = template.render(**context)
+    context = logic.get_summary_data(fields=SUMMARY_TEMPLATE_FIELDS["summary.html"], lazy=True, jobs=jobs,
+                                     heatmap_range=heatmap_range)
+    context['max_gaps'] = max_gaps
+    context['gaps_per_page'] = GAPS_PER_PAGE
     
-    # 4 & 5. Save and open the file (no changes here)
+    # 2 - 4. Render the template and save it
     output_path = Path.cwd() / "habit_summary.html"
-    with open(output_path, "w") as f:
-        f.write(html_output)
+    render_summary_html(context, output_path)
         
     console.print(f"✅ Summary saved to: [bold green]{output_path}[/bold green]")
     
     if click.confirm("Do you want to open the report now?"):
+        import webbrowser
         webbrowser.open(output_path.as_uri())
 
 
 
 @cli.command(name="summary")
-def summary_terminal():
+@click.option('--fleet', 'fleet_dir', type=click.Path(exists=True, file_okay=False), default=None,
+              help="Summarize every habit database (*.db) below this directory instead.")
+@click.option('--jobs', '-j', type=click.IntRange(min=1), default=None,
+              help="Worker processes reading the fleet's databases [default: one per CPU].")
+@click.option('--html', 'html_path', type=click.Path(dir_okay=False), default=None,
+              help="Also write the fleet report, with every database, as HTML to this file.")
+def summary_terminal(fleet_dir, jobs, html_path):
     """Prints a summarized report of your habits directly to the terminal."""
+    if fleet_dir:
+        _fleet_summary(fleet_dir, jobs, html_path)
+        return
+    if jobs or html_path:
+        console.print("Error: --jobs and --html only apply to --fleet.", style="bold red")
+        return
     console.print("Fetching habit summary...", style="cyan")
 
-    # 1. Prepare data using the master function
-    context = logic.get_summary_data()
+    # 1. Prepare only the fields the table shows
+    context = logic.get_summary_data(fields=SUMMARY_TERMINAL_FIELDS)
 
     # The 'context' dictionary should contain a key for your habit data, 
     # for example, 'habits' which is a list of habit objects/dictionaries.
@@ -208,40 +415,158 @@ def summary_terminal():
         return
 
     # 2. Create the Rich Table
-    table = Table(
-        title="Habit Tracker Summary", 
-        show_header=True, 
-        header_style="bold magenta", 
-        show_lines=True
-    )
+    with profiling.phase("render.summary_terminal"):
+        from rich.table import Table
+        table = Table(
+            title="Habit Tracker Summary", 
+            show_header=True, 
+            header_style="bold magenta", 
+            show_lines=True
+        )
     
-    # Define columns based on the data you want to display
-    table.add_column("Habit Name", style="bold green", min_width=20)
-    table.add_column("Period", justify="center")
-    table.add_column("Current Streak", justify="right", style="cyan")
-    table.add_column("Longest Streak", justify="right", style="blue")
-    table.add_column("Completion %", justify="right", style="yellow")
-
-    # 3. Populate the Table with data
-    for habit in habits_data:
-        # Assuming your habit data structure looks something like this:
-        name = habit.get("name", "N/A")
-        period = habit.get("period", "N/A").title() # e.g., 'daily' -> 'Daily'
-        current_streak = str(habit.get("current_streak", 0))
-        longest_streak = str(habit.get("longest_streak", 0))
-        # Calculate a simple completion percentage for display
-        total_checks = habit.get("total_checks", 0)
-        total_possible = habit.get("total_possible", 1) # Avoid ZeroDivisionError
-        completion_percent = f"{(total_checks / total_possible) * 100:.1f}%"
+        # Define columns based on the data you want to display
+        table.add_column("Habit Name", style="bold green", min_width=20)
+        table.add_column("Period", justify="center")
+        table.add_column("Current Streak", justify="right", style="cyan")
+        table.add_column("Longest Streak", justify="right", style="blue")
+        table.add_column("Completion %", justify="right", style="yellow")
+
+        # 3. Populate the Table with data
+        for habit in habits_data:
+            # Assuming your habit data structure looks something like this:
+            name = habit.get("name", "N/A")
+            period = habit.get("period", "N/A").title() # e.g., 'daily' -> 'Daily'
+            current_streak = str(habit.get("current_streak", 0))
+            longest_streak = str(habit.get("longest_streak", 0))
+            # Calculate a simple completion percentage for display
+            total_checks = habit.get("total_checks", 0)
+            total_possible = habit.get("total_possible", 1) # Avoid ZeroDivisionError
+            completion_percent = f"{(total_checks / total_possible) * 100:.1f}%"
         
-        table.add_row(
-            name,
-            period,
-            current_streak,
-            longest_streak,
-            completion_percent
-        )
+            table.add_row(
+                name,
+                period,
+                current_streak,
+                longest_streak,
+                completion_percent
+            )
+
+        # 4. Print the table to the console
+        console.print(table)
+    console.print("\n[bold green]Summary complete.[/bold green]")
+
+def _fleet_summary(fleet_dir, jobs, html_path):
+    """Prints the fleet totals and percentiles and optionally writes the HTML fleet report."""
+    from . import fleet
+    console.print(f"Summarizing habit databases in {fleet_dir}...", style="cyan")
+    with profiling.phase("fleet.get_fleet_summary"):
+        report = fleet.get_fleet_summary(fleet_dir, jobs=jobs)
+
+    totals = report['totals']
+    if not totals['databases'] and not report['failed']:
+        console.print("[bold yellow]No habit databases (*.db) found.[/bold yellow]")
+        return
+
+    with profiling.phase("render.fleet_terminal"):
+        from rich.table import Table
+        table = Table(title="Habit Fleet Summary", show_header=True, header_style="bold magenta")
+        table.add_column("Databases", justify="right")
+        table.add_column("Active Habits", justify="right", style="bold green")
+        table.add_column("Archived", justify="right")
+        table.add_column("Completions", justify="right", style="cyan")
+        table.add_column("Done Today", justify="right", style="yellow")
+        table.add_column("Longest Streak", justify="right", style="blue")
+        table.add_row(*(str(totals[key]) for key in
+                        ('databases', 'active', 'archived', 'completions', 'done_today', 'longest_streak')))
+        console.print(table)
+
+        spread = Table(title="Across Databases", show_header=True, header_style="bold magenta")
+        spread.add_column("Metric", style="bold green")
+        for percentile in fleet.PERCENTILES:
+            spread.add_column(f"p{percentile}", justify="right")
+        spread.add_row("Completion %", *(f"{value:.1f}%" for value in report['percentiles']['completion_rate'].values()))
+        spread.add_row("Done today %", *(f"{value:.1f}%" for value in report['percentiles']['done_today_share'].values()))
+        spread.add_row("Current streak (per habit)", *(str(value) for value in report['percentiles']['current_streak'].values()))
+        console.print(spread)
+
+    for failure in report['failed']:
+        console.print(f"Skipped {failure['name']}: {failure['error']}", style="yellow")
+
+    if html_path:
+        with profiling.phase("render.fleet_html"):
+            template = _get_template_env().get_template("fleet.html")
+            with open(html_path, "w", encoding="utf-8") as f:
+                template.stream(**report).dump(f)
+        console.print(f"✅ Fleet report saved to: [bold green]{Path(html_path).resolve()}[/bold green]")
+
+@cli.command()
+def serve():
+    """Runs a daemon answering list, done and summary from a warm process."""
+    from . import daemon
+    daemon.serve(ready=lambda path: console.print(
+        f"Serving habits on {path} (Ctrl+C to stop). 'list', 'done' and 'summary' now use it.", style="cyan"
+    ))
+
+@cli.command(name="import")
+@click.argument('path', type=click.Path(exists=True, dir_okay=False, allow_dash=True))
+@click.option('--format', 'fmt', type=click.Choice(transfer.FORMATS), default=None,
+              help="File format (guessed from the extension by default).")
+def import_data(path, fmt):
+    """Imports habits and completions from a CSV or JSONL file ('-' for stdin)."""
+    fmt = transfer.detect_format(path, fmt)
+
+    with transfer.open_file(path, "r") as f:
+        try:
+            created, read, inserted = db_manager.import_records(transfer.read_records(f, fmt))
+        except (ValueError, KeyError) as error:
+            console.print(f"Error: {error}", style="bold red")
+            return
+
+    console.print(
+        f"Imported {inserted} new completions ({read - inserted} already recorded) "
+        f"and created {created} habit(s).", style="green"
+    )
+
+
+@cli.command(name="export")
+@click.argument('path', type=click.Path(dir_okay=False, allow_dash=True), default="-")
+@click.option('--format', 'fmt', type=click.Choice(transfer.FORMATS), default=None,
+              help="File format (guessed from the extension by default).")
+def export_data(path, fmt):
+    """Exports all habits and completions to a CSV or JSONL file ('-' for stdout)."""
+    fmt = transfer.detect_format(path, fmt)
+
+    with transfer.open_file(path, "w") as f:
+        count = transfer.write_records(f, db_manager.iter_export_rows(), fmt)
+
+    # Keep stdout clean when the export itself goes there
+    click.echo(f"Exported {count} rows to {'stdout' if path == '-' else path}.", err=True)
+
+
+@cli.group()
+def stats():
+    """Maintains the stored per-habit statistics."""
+    pass
+
+
+@stats.command(name="rebuild")
+def stats_rebuild():
+    """Recomputes all habit statistics and checks them against the stored values."""
+    console.print("Rebuilding habit statistics...", style="cyan")
+    mismatches = db_manager.rebuild_habit_stats()
+
+    if not mismatches:
+        console.print("✅ Stored statistics were up to date.", style="green")
+        return
+
+    from rich.table import Table
+    table = Table(title="Corrected Statistics", show_header=True, header_style="bold magenta")
+    table.add_column("Habit ID", style="dim")
+    table.add_column("Stored")
+    table.add_column("Recomputed")
+
+    for habit_id, stored, recomputed in mismatches:
+        table.add_row(str(habit_id), str(stored), str(recomputed))
 
-    # 4. Print the table to the console
     console.print(table)
-    console.print("\n[bold green]Summary complete.[/bold green]")
\ No newline at end of file
+    console.print(f"Fixed statistics for {len(mismatches)} habit(s).", style="yellow")
@@ -0,0 +1,72 @@
+"""
+Thin client for a running 'habit serve' daemon.
+
+Only the standard library's socket and json are imported here, so a hot command
+answered by the daemon skips the Click, Rich and database startup entirely.
+"""
+import json
+import os
+import socket
+import sys
+
+from . import db_manager, profiling
+
+# Commands the daemon answers; anything else runs in-process
+SERVED_COMMANDS = ('list', 'done', 'summary')
+# Options that make a served command read beyond the daemon's database
+DIRECT_OPTIONS = ('--fleet',)
+# Set to any value to always run commands in-process
+NO_DAEMON_ENV_VAR = "HABIT_NO_DAEMON"
+
+
+def socket_path():
+    """Returns the Unix socket 'habit serve' listens on for the current database."""
+    return db_manager.DB_PATH.with_name(db_manager.DB_PATH.name + ".sock")
+
+def send_request(request: dict, timeout: float = 30.0) -> dict | None:
+    """
+    Sends one JSON request to the daemon and returns its JSON response.
+    :return: None if no daemon is listening or it failed to answer, so the caller can run
+             the command itself. Re-running a 'done' the daemon already applied is harmless,
+             as completions are inserted with INSERT OR IGNORE.
+    """
+    path = socket_path()
+    if not hasattr(socket, "AF_UNIX") or not path.exists():
+        return None
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+        sock.settimeout(timeout)
+        try:
+            sock.connect(str(path))
+        except OSError:
+            return None # A socket left behind by a daemon that is gone
+        try:
+            sock.sendall(json.dumps(request).encode() + b"\n")
+            with sock.makefile("rb") as reply:
+                return json.loads(reply.readline())
+        except (OSError, ValueError):
+            return None # The daemon died or timed out mid-request
+
+def dispatch(argv: list[str]) -> int | None:
+    """
+    Runs a served command through the daemon, writing its output to stdout/stderr.
+    :return: The command's exit code, or None if it must run in-process instead.
+    """
+    if not argv or argv[0] not in SERVED_COMMANDS:
+        return None
+    if any(arg.split("=", 1)[0] in DIRECT_OPTIONS for arg in argv):
+        return None
+    if os.environ.get(NO_DAEMON_ENV_VAR) or profiling.trace_requested():
+        return None
+
+    color = sys.stdout.isatty() and not os.environ.get("NO_COLOR")
+    try:
+        width = os.get_terminal_size(sys.stdout.fileno()).columns
+    except OSError:
+        width = None
+    response = send_request({'argv': argv, 'width': width, 'color': color})
+    if response is None:
+        return None
+
+    sys.stdout.write(response['stdout'])
+    sys.stderr.write(response['stderr'])
+    return response['exit_code']
@@ -0,0 +1,133 @@
+"""
+'habit serve': a long-running process answering hot commands over a Unix socket.
+
+The daemon keeps the database connection, the imported CLI and Rich, and the
+logic stats index warm, and runs each request through the regular Click commands
+with their output captured, so answers are identical to direct mode.
+Requests are handled one at a time on the event loop: every command shares the
+process's single SQLite connection and console.
+"""
+import asyncio
+import io
+import json
+import os
+import signal
+import socket
+from contextlib import redirect_stderr, redirect_stdout
+from datetime import date
+
+import click
+
+from . import client, db_manager, logic
+from . import cli as cli_module
+
+
+# Commands whose output only depends on the data, the date and the terminal,
+# so a rendered answer can be replayed until one of those changes
+READ_ONLY_COMMANDS = ('list', 'summary')
+
+# (argv, width, color) -> (today, data fingerprint, response)
+_responses = {}
+
+
+def run_command(argv: list[str], width: int | None = None, color: bool = False) -> dict:
+    """
+    Runs a served CLI command in this process with its output captured.
+    Answers to read-only commands are reused while the data and the date stay the same.
+    :return: A response dict with the command's stdout, stderr and exit code.
+    """
+    if not argv or argv[0] not in client.SERVED_COMMANDS:
+        return {'stdout': "", 'stderr': f"Error: '{' '.join(argv)}' is not served by the daemon.\n", 'exit_code': 2}
+    if argv[0] not in READ_ONLY_COMMANDS:
+        return _run_command(argv, width, color)
+
+    # Deferred completions count as data: fold them in before checking the fingerprint
+    db_manager.merge_pending_writes()
+    key = (tuple(argv), width, color)
+    today, fingerprint = date.today(), db_manager.data_fingerprint()
+    cached = _responses.get(key)
+    if cached is None or cached[0] != today or cached[1] != fingerprint:
+        cached = _responses[key] = (today, fingerprint, _run_command(argv, width, color))
+    return cached[2]
+
+def _run_command(argv: list[str], width: int | None, color: bool) -> dict:
+    from rich.console import Console
+
+    stdout, stderr = io.StringIO(), io.StringIO()
+    console = Console(file=stdout, width=width, force_terminal=color, no_color=not color)
+    previous, cli_module._LazyConsole._console = cli_module._LazyConsole._console, console
+    exit_code = 0
+    try:
+        with redirect_stdout(stdout), redirect_stderr(stderr):
+            cli_module.cli.main(args=argv, prog_name="habit", standalone_mode=False, obj={})
+    except click.ClickException as error:
+        error.show(file=stderr)
+        exit_code = error.exit_code
+    except click.exceptions.Exit as error:
+        exit_code = error.exit_code
+    except click.Abort:
+        stderr.write("Aborted!\n")
+        exit_code = 1
+    finally:
+        cli_module._LazyConsole._console = previous
+    return {'stdout': stdout.getvalue(), 'stderr': stderr.getvalue(), 'exit_code': exit_code}
+
+async def _handle_connection(reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+    """Answers the one JSON request a client sends per connection."""
+    try:
+        line = await reader.readline()
+        if line:
+            try:
+                request = json.loads(line)
+                response = run_command(request['argv'], request.get('width'), request.get('color', False))
+            except Exception as error: # Never let one bad request take the daemon down
+                response = {'stdout': "", 'stderr': f"Error: {error}\n", 'exit_code': 1}
+            writer.write(json.dumps(response).encode() + b"\n")
+            await writer.drain()
+    finally:
+        writer.close()
+
+def _claim_socket(path):
+    """Removes a socket left behind by a daemon that is gone, or fails if one is still running."""
+    if not path.exists():
+        return
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as probe:
+        try:
+            probe.connect(str(path))
+        except OSError:
+            path.unlink()
+            return
+    raise click.ClickException(f"A daemon is already listening on {path}")
+
+async def _serve(path, ready=None):
+    # Only the owner may talk to their habits: the socket is created owner-only from the start
+    umask = os.umask(0o177)
+    try:
+        server = await asyncio.start_unix_server(_handle_connection, path=str(path))
+    finally:
+        os.umask(umask)
+    stop = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for signum in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(signum, stop.set)
+    if ready:
+        ready(path)
+    async with server:
+        await stop.wait()
+
+def serve(ready=None):
+    """
+    Warms up the connection and the stats index, then answers requests until SIGINT/SIGTERM.
+    :param ready: Optional callback invoked with the socket path once requests are accepted.
+    """
+    path = client.socket_path()
+    _claim_socket(path)
+
+    logic.enable_stats_index()
+    db_manager.merge_pending_writes()
+    logic.get_enriched_habits_data(status='active')
+    try:
+        asyncio.run(_serve(path, ready))
+    finally:
+        if path.exists():
+            path.unlink()
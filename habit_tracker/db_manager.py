@@ -1,27 +1,160 @@
+import atexit
+import json
+import os
+import random
 import sqlite3
+import time
+from contextlib import contextmanager
+from functools import wraps
+from itertools import groupby
 from pathlib import Path
-from datetime import date
+from datetime import date, datetime, timedelta
+from . import profiling
+
+try:
+    import fcntl
+except ImportError: # Windows: deferred writes fall back to direct ones
+    fcntl = None
 
 # Define the path to the database file relative to the project root
 DB_DIR = Path.home() / ".habit-cli"
-# Define the final database path
-DB_PATH = DB_DIR / "habits.db"
+# Define the final database path; HABIT_DB (or 'habit --db') points at another one
+DB_PATH = Path(os.environ.get("HABIT_DB") or DB_DIR / "habits.db").expanduser().resolve()
 DB_PATH.parent.mkdir(parents=True, exist_ok=True) # Ensure the 'db' directory exists
 
 
+# Pragmas applied to every new connection.
+# WAL lets readers and the writer work concurrently and makes commits cheaper,
+# synchronous=NORMAL is durable enough in WAL mode, the negative cache size is in KiB,
+# and foreign keys are required for the ON DELETE CASCADE on completions to fire.
+CONNECTION_PRAGMAS = (
+    "PRAGMA journal_mode = WAL",
+    "PRAGMA synchronous = NORMAL",
+    "PRAGMA cache_size = -8000",
+    "PRAGMA foreign_keys = ON",
+)
+
+# Seconds a connection waits for another process's write lock before giving up
+BUSY_TIMEOUT = float(os.environ.get("HABIT_BUSY_TIMEOUT", "10"))
+# How often a write that still finds the database locked is retried, with backoff
+WRITE_RETRIES = int(os.environ.get("HABIT_WRITE_RETRIES", "5"))
+
+# Size of the pending-writes journal at which a deferred write merges it into the database
+PENDING_MERGE_BYTES = 64 * 1024
+
+# The single connection shared by the whole process, opened lazily
+_connection = None
+# Whether that connection is opened read-only (e.g. in report worker processes)
+_read_only = False
+
+
 def get_db_connection():
-    """Establishes a connection to the SQLite database."""
-    conn = sqlite3.connect(DB_PATH)
-    conn.row_factory = sqlite3.Row # Allows accessing columns by name
-    return conn
+    """
+    Returns the process-wide connection to the SQLite database.
+    The connection is opened and tuned on first use and reused afterwards.
+    """
+    global _connection
+    if _connection is None:
+        # When profiling, every statement is counted and timed by the traced connection
+        factory = profiling.TracedConnection if profiling.enabled else sqlite3.Connection
+        if _read_only:
+            conn = sqlite3.connect(f"{DB_PATH.as_uri()}?mode=ro", uri=True, timeout=BUSY_TIMEOUT, factory=factory)
+        else:
+            conn = sqlite3.connect(DB_PATH, timeout=BUSY_TIMEOUT, factory=factory)
+        conn.row_factory = sqlite3.Row # Allows accessing columns by name
+        for pragma in CONNECTION_PRAGMAS:
+            # The journal mode is a property of the file and cannot be changed read-only
+            if not (_read_only and "journal_mode" in pragma):
+                conn.execute(pragma)
+        _connection = conn
+    return _connection
 
-def init_db():
-    """Initializes the database by creating the necessary tables if they don't exist."""
+def close_db_connection():
+    """Closes the process-wide connection, if one is open."""
+    global _connection
+    if _connection is not None:
+        _connection.close()
+        _connection = None
+
+atexit.register(close_db_connection)
+
+def process_pool(workers: int):
+    """
+    Returns a ProcessPoolExecutor for work on the database. The process-wide connection
+    is closed first: an SQLite connection must not be carried across fork, so each
+    worker opens its own (see set_db_path).
+    """
+    from concurrent.futures import ProcessPoolExecutor
+
+    close_db_connection()
+    return ProcessPoolExecutor(max_workers=workers)
+
+def set_db_path(path, read_only: bool = False):
+    """
+    Points the module at another database file, closing any connection to the current one.
+    :param read_only: Open the new connection read-only (it must not be used for writes).
+    """
+    global DB_PATH, _read_only
+    close_db_connection()
+    DB_PATH = Path(path).resolve()
+    _read_only = read_only
+    DB_PATH.parent.mkdir(parents=True, exist_ok=True)
+
+@contextmanager
+def db_session():
+    """
+    Yields the shared connection as a transactional scope.
+    The write lock is taken up front (BEGIN IMMEDIATE), so concurrent writers queue on
+    the busy timeout instead of failing halfway. Changes are committed when the block
+    exits and rolled back if it raises. Nested sessions join the outer transaction.
+    A transaction that changed any row also bumps the database's write counter.
+    """
     conn = get_db_connection()
-    cursor = conn.cursor()
-    
+    if conn.in_transaction:
+        yield conn
+        return
+
+    conn.execute("BEGIN IMMEDIATE")
+    changes = conn.total_changes
+    try:
+        yield conn
+        if conn.total_changes != changes and get_schema_version() >= WRITE_COUNTER_VERSION:
+            conn.execute("UPDATE db_state SET write_count = write_count + 1")
+    except BaseException:
+        conn.rollback()
+        raise
+    conn.commit()
+
+def _is_lock_error(error: sqlite3.OperationalError) -> bool:
+    message = str(error).lower()
+    return "locked" in message or "busy" in message
+
+def retry_on_lock(func):
+    """
+    Decorator retrying a write that failed because another process held the database lock,
+    up to WRITE_RETRIES times with jittered exponential backoff.
+    The wrapped function must be safe to re-run, i.e. do all its writes in one session.
+    """
+    @wraps(func)
+    def wrapper(*args, **kwargs):
+        for attempt in range(WRITE_RETRIES + 1):
+            try:
+                return func(*args, **kwargs)
+            except sqlite3.OperationalError as error:
+                if not _is_lock_error(error) or attempt == WRITE_RETRIES:
+                    raise
+                time.sleep(min(0.05 * 2 ** attempt, 2.0) * (0.5 + random.random()))
+    return wrapper
+
+# SQL expression turning an ISO date (or datetime) into its day ordinal, as date.toordinal() does.
+# julianday() is 1721425.5 on 0001-01-01, which is ordinal 1.
+def _day_ordinal_sql(column: str) -> str:
+    return f"CAST(julianday(date({column})) - 1721424.5 AS INTEGER)"
+
+def _migrate_initial_schema(conn):
+    """Version 1: habits, completions and the materialized habit_stats."""
     # Create the 'habits' table
-    cursor.execute("""
+    conn.execute("""
     CREATE TABLE IF NOT EXISTS habits (
         id INTEGER PRIMARY KEY AUTOINCREMENT,
         name TEXT NOT NULL,
@@ -33,7 +166,7 @@ def init_db():
     """)
 
     # Create the 'completions' table
-    cursor.execute("""
+    conn.execute("""
     CREATE TABLE IF NOT EXISTS completions (
         id INTEGER PRIMARY KEY AUTOINCREMENT,
         habit_id INTEGER NOT NULL,
@@ -41,21 +174,139 @@ def init_db():
         FOREIGN KEY (habit_id) REFERENCES habits (id) ON DELETE CASCADE
     );
     """)
-    
+
     # Add a unique constraint to prevent duplicate completions for the same habit on the same day
-    cursor.execute("""
+    conn.execute("""
     CREATE UNIQUE INDEX IF NOT EXISTS idx_habit_date ON completions (habit_id, completed_at);
     """)
-    
-    conn.commit()
-    conn.close()
 
+    # Index habits by status in display order, so a display ID resolves without a full scan
+    conn.execute("""
+    CREATE INDEX IF NOT EXISTS idx_habits_status_created ON habits (status, created_at, id);
+    """)
+
+    # Create the 'habit_stats' table, a materialized summary of each habit's completions.
+    # run_start/run_end describe the most recent run of consecutive completion days.
+    conn.execute("""
+    CREATE TABLE IF NOT EXISTS habit_stats (
+        habit_id INTEGER PRIMARY KEY,
+        total_completions INTEGER NOT NULL DEFAULT 0,
+        run_start DATE,
+        run_end DATE,
+        longest_streak INTEGER NOT NULL DEFAULT 0,
+        FOREIGN KEY (habit_id) REFERENCES habits (id) ON DELETE CASCADE
+    );
+    """)
+
+def _migrate_day_ordinals(conn):
+    """
+    Version 2: integer day ordinals next to every stored date, so streaks and gaps are
+    computed on integers. They are virtual generated columns: derived from the dates
+    by SQLite itself, so no write path has to maintain them and they can never drift.
+    """
+    for table, column, source in (('completions', 'completed_day', 'completed_at'),
+                                  ('habits', 'created_day', 'created_at'),
+                                  ('habit_stats', 'run_start_day', 'run_start'),
+                                  ('habit_stats', 'run_end_day', 'run_end')):
+        conn.execute(f"ALTER TABLE {table} ADD COLUMN {column} INTEGER "
+                     f"GENERATED ALWAYS AS ({_day_ordinal_sql(source)}) VIRTUAL")
+
+    # Covering index for the per-habit streak and gap scans; the ordinals are stored in it
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_completions_habit_day ON completions (habit_id, completed_day)")
+
+def _migrate_write_counter(conn):
+    """
+    Version 3: a counter of committed write transactions, maintained by db_session.
+    Unlike PRAGMA data_version, which only means something to the connection reading it,
+    the counter can be compared across processes, e.g. to validate the on-disk stats cache.
+    """
+    conn.execute("""
+    CREATE TABLE IF NOT EXISTS db_state (
+        id INTEGER PRIMARY KEY CHECK (id = 1),
+        write_count INTEGER NOT NULL DEFAULT 0
+    );
+    """)
+    conn.execute("INSERT OR IGNORE INTO db_state (id) VALUES (1)")
+
+# Forward migrations; MIGRATIONS[n - 1] brings a database from version n - 1 to n.
+# Append new migrations here, never edit released ones: databases already past them won't rerun them.
+MIGRATIONS = (
+    _migrate_initial_schema,
+    _migrate_day_ordinals,
+    _migrate_write_counter,
+)
+# First schema versions with the day ordinal columns and with db_state.write_count
+DAY_ORDINALS_VERSION = 2
+WRITE_COUNTER_VERSION = 3
+# Version of the schema created by init_db, stored in the database's user_version.
+SCHEMA_VERSION = len(MIGRATIONS)
+
+
+def data_fingerprint() -> tuple[int, int]:
+    """
+    Returns a value that changes whenever the database's data may have changed:
+    PRAGMA data_version covers commits by other connections, total_changes this one's writes.
+    """
+    conn = get_db_connection()
+    return conn.execute("PRAGMA data_version").fetchone()[0], conn.total_changes
+
+def get_write_count() -> int:
+    """Returns the number of write transactions committed to the database so far, by any process."""
+    return get_db_connection().execute("SELECT write_count FROM db_state").fetchone()[0]
+
+def get_schema_version() -> int:
+    """Returns the schema version of the current database (0 for a new one)."""
+    return get_db_connection().execute("PRAGMA user_version").fetchone()[0]
+
+def _backup_database(version: int) -> Path:
+    """Copies the database next to itself before it is migrated away from `version`."""
+    backup_path = DB_PATH.with_name(f"{DB_PATH.name}.v{version}.bak")
+    target = sqlite3.connect(backup_path)
+    try:
+        get_db_connection().backup(target)
+    finally:
+        target.close()
+    return backup_path
+
+def init_db():
+    """
+    Creates the database or migrates it to SCHEMA_VERSION.
+    Each migration runs in its own transaction together with the user_version bump,
+    so an interrupted upgrade leaves the database at the last completed version.
+    Returns immediately if the database already has the current schema version.
+    """
+    conn = get_db_connection()
+    version = get_schema_version()
+    if version >= SCHEMA_VERSION:
+        return
+
+    # Databases that hold data are backed up once before being upgraded
+    if conn.execute("SELECT 1 FROM sqlite_master WHERE name = 'habits'").fetchone():
+        _backup_database(version)
+
+    for target in range(version + 1, SCHEMA_VERSION + 1):
+        with db_session() as conn:
+            # Another process may have migrated while this one waited for the write lock
+            if get_schema_version() >= target:
+                continue
+            MIGRATIONS[target - 1](conn)
+            conn.execute(f"PRAGMA user_version = {target}")
+
+    # Databases created before the stats table existed need their stats filled in once
+    missing = conn.execute("""
+        SELECT h.id FROM habits h LEFT JOIN habit_stats s ON s.habit_id = h.id
+        WHERE s.habit_id IS NULL
+    """).fetchall()
+    if missing:
+        with db_session() as conn:
+            _refresh_habits_stats(conn, [row['id'] for row in missing])
+
+@retry_on_lock
 def add_habit(name: str, description: str = ""):
     """Adds a new habit to the database."""
-    conn = get_db_connection()
-    conn.execute("INSERT INTO habits (name, description) VALUES (?, ?)", (name, description))
-    conn.commit()
-    conn.close()
+    with db_session() as conn:
+        cursor = conn.execute("INSERT INTO habits (name, description) VALUES (?, ?)", (name, description))
+        conn.execute("INSERT INTO habit_stats (habit_id) VALUES (?)", (cursor.lastrowid,))
 
 def get_habits(status: str = 'active'):
     """
@@ -64,42 +315,501 @@ def get_habits(status: str = 'active'):
     """
     conn = get_db_connection()
     if status == 'all':
-        habits = conn.execute("SELECT * FROM habits ORDER BY created_at").fetchall()
+        habits = conn.execute("SELECT * FROM habits ORDER BY created_at, id").fetchall()
     else:
-        habits = conn.execute("SELECT * FROM habits WHERE status = ? ORDER BY created_at", (status,)).fetchall()
-    conn.close()
+        habits = conn.execute("SELECT * FROM habits WHERE status = ? ORDER BY created_at, id", (status,)).fetchall()
     return habits
 
+# Ordinal of a habit's first tracked day: its creation day, or its first completion if that
+# was backfilled before creation (one probe of idx_completions_habit_day)
+FIRST_DAY_SQL = """MIN(h.created_day, COALESCE(
+    (SELECT MIN(c.completed_day) FROM completions c WHERE c.habit_id = h.id), h.created_day
+))"""
+
+# Largest value SQLite can bind as an INTEGER; larger display positions cannot exist
+MAX_POSITION = 2**63 - 1
+
+def get_habit_by_position(status: str, position: int):
+    """
+    Retrieves the habit at a 1-based position in the display order of a status,
+    as shown by 'habit list'. Only the id, name, creation day and first day are loaded.
+    :return: The habit row, or None if there is no habit at that position.
+    """
+    if not 1 <= position <= MAX_POSITION:
+        return None
+    conn = get_db_connection()
+    return conn.execute(
+        f"SELECT h.id, h.name, h.created_day, {FIRST_DAY_SQL} AS first_day "
+        "FROM habits h WHERE h.status = ? ORDER BY h.created_at, h.id LIMIT 1 OFFSET ?",
+        (status, position - 1)
+    ).fetchone()
+
+def get_habits_by_positions(status: str, positions: list[int]) -> dict:
+    """
+    Resolves several 1-based display positions of a status with one query.
+    :return: A dict mapping each valid position to its habit row (id and name).
+    """
+    valid = [position for position in positions if 1 <= position <= MAX_POSITION]
+    if not valid:
+        return {}
+    conn = get_db_connection()
+    rows = conn.execute(
+        "SELECT id, name FROM habits WHERE status = ? ORDER BY created_at, id LIMIT ?",
+        (status, max(valid))
+    ).fetchall()
+    return {position: rows[position - 1] for position in valid if position <= len(rows)}
+
+@retry_on_lock
 def update_habit_status(habit_id: int, new_status: str):
     """Updates the status of a habit (e.g., 'active' or 'archived')."""
-    conn = get_db_connection()
-    conn.execute("UPDATE habits SET status = ? WHERE id = ?", (new_status, habit_id))
-    conn.commit()
-    conn.close()
+    with db_session() as conn:
+        conn.execute("UPDATE habits SET status = ? WHERE id = ?", (new_status, habit_id))
 
+@retry_on_lock
 def delete_habit(habit_id: int):
-    """Deletes a habit and its associated completions from the database."""
-    conn = get_db_connection()
-    conn.execute("DELETE FROM habits WHERE id = ?", (habit_id,))
-    conn.commit()
-    conn.close()
+    """Deletes a habit, its associated completions and its stats from the database."""
+    with db_session() as conn:
+        conn.execute("DELETE FROM habit_stats WHERE habit_id = ?", (habit_id,))
+        conn.execute("DELETE FROM habits WHERE id = ?", (habit_id,))
 
 def add_completion(habit_id: int, completion_date: date):
-    """Adds a completion record for a habit on a specific date."""
+    """Adds a completion record for a habit on a specific date and updates its stats."""
+    # A day that is already recorded is skipped by add_completions' INSERT OR IGNORE
+    add_completions([habit_id], [completion_date])
+
+@retry_on_lock
+def add_completions(habit_ids: list[int], completion_dates: list[date]) -> int:
+    """
+    Marks every habit as done on every date in a single transaction.
+    Rows are written with one executemany; days already recorded are skipped.
+    :return: The number of completions actually added.
+    """
+    rows = [(habit_id, day.isoformat()) for habit_id in habit_ids for day in completion_dates]
+    with db_session() as conn:
+        before = conn.total_changes
+        conn.executemany("INSERT OR IGNORE INTO completions (habit_id, completed_at) VALUES (?, ?)", rows)
+        inserted = conn.total_changes - before
+
+        if inserted and len(rows) == 1:
+            # The everyday case of one habit done today keeps the O(1) incremental update
+            _record_completion_stats(conn, habit_ids[0], completion_dates[0])
+        elif inserted:
+            _refresh_habits_stats(conn, habit_ids)
+    return inserted
+
+def pending_writes_path() -> Path:
+    """Returns the append-only journal of deferred completions kept next to the database."""
+    return DB_PATH.with_name(DB_PATH.name + "-pending")
+
+def defer_completions(habit_ids: list[int], completion_dates: list[date]) -> bool:
+    """
+    Appends completions to the pending-writes journal instead of writing them to SQLite,
+    so that many processes can record completions without queueing on the write lock.
+    The journal is folded into the database by merge_pending_writes.
+    :return: False if the platform has no file locking and the completions were written directly.
+    """
+    if fcntl is None:
+        add_completions(habit_ids, completion_dates)
+        return False
+
+    lines = "".join(json.dumps({'habit_id': habit_id, 'date': day.isoformat()}) + "\n"
+                    for habit_id in habit_ids for day in completion_dates)
+    with open(pending_writes_path(), "a", encoding="utf-8") as journal:
+        fcntl.flock(journal, fcntl.LOCK_EX)
+        journal.write(lines)
+        journal.flush()
+        size = journal.tell()
+    if size >= PENDING_MERGE_BYTES:
+        merge_pending_writes()
+    return True
+
+@retry_on_lock
+def merge_pending_writes() -> int:
+    """
+    Writes the completions waiting in the pending-writes journal in one batch and empties it.
+    The journal stays locked until the batch is committed, and replaying it is harmless
+    (INSERT OR IGNORE), so an interrupted merge never loses or duplicates a completion.
+    :return: The number of completions actually added.
+    """
+    path = pending_writes_path()
+    if fcntl is None or not path.exists() or path.stat().st_size == 0:
+        return 0
+
+    with open(path, "r+", encoding="utf-8") as journal:
+        fcntl.flock(journal, fcntl.LOCK_EX)
+        rows = []
+        for line in journal:
+            try:
+                entry = json.loads(line)
+                rows.append((entry['habit_id'], date.fromisoformat(entry['date']).isoformat()))
+            except (ValueError, KeyError, TypeError):
+                continue # A torn line from a writer that crashed mid-append
+        if not rows:
+            journal.truncate(0)
+            return 0
+
+        with db_session() as conn:
+            before = conn.total_changes
+            # Completions of habits deleted in the meantime are dropped
+            conn.executemany(
+                "INSERT OR IGNORE INTO completions (habit_id, completed_at) "
+                "SELECT ?1, ?2 WHERE EXISTS (SELECT 1 FROM habits WHERE id = ?1)", rows
+            )
+            inserted = conn.total_changes - before
+            if inserted:
+                _refresh_habits_stats(conn, list({habit_id for habit_id, _ in rows}))
+        journal.truncate(0)
+    return inserted
+
+def iter_completions(habit_id: int, since: date | None = None, until: date | None = None,
+                     limit: int | None = None, page_size: int = 1000):
+    """
+    Streams a habit's completion dates, newest first, one page at a time.
+    Pages are fetched with keyset pagination on (habit_id, completed_at), each continuing
+    below the last date seen, so every page is a short range scan of idx_habit_date
+    however long the history is, and no read transaction is held between pages.
+    :param since: Only completions on or after this day.
+    :param until: Only completions on or before this day.
+    :param limit: Stop after this many completions.
+    :return: A generator of 'YYYY-MM-DD' strings.
+    """
     conn = get_db_connection()
-    try:
-        conn.execute("INSERT INTO completions (habit_id, completed_at) VALUES (?, ?)", (habit_id, completion_date))
-        conn.commit()
-    except sqlite3.IntegrityError:
-        # This error occurs if the unique constraint (habit_id, completed_at) is violated.
-        # It means the habit is already marked as done for that day.
-        pass
-    finally:
-        conn.close()
+    params = {'habit_id': habit_id,
+              'since': since.isoformat() if since else None,
+              'before': (until + timedelta(days=1)).isoformat() if until else None}
+    conditions = ["habit_id = :habit_id"]
+    if since:
+        conditions.append("completed_at >= :since")
+
+    remaining = limit
+    while remaining is None or remaining > 0:
+        where = conditions + (["completed_at < :before"] if params['before'] else [])
+        params['page'] = page_size if remaining is None else min(page_size, remaining)
+        page = [row[0] for row in conn.execute(
+            f"SELECT completed_at FROM completions WHERE {' AND '.join(where)} "
+            f"ORDER BY completed_at DESC LIMIT :page", params
+        )]
+        yield from page
+        if len(page) < params['page']:
+            return
+        if remaining is not None:
+            remaining -= len(page)
+        params['before'] = page[-1]
+
 
-def get_completions(habit_id: int):
-    """Retrieves all completion dates for a specific habit."""
+def get_completions_by_habit(status: str = 'active'):
+    """
+    Retrieves the completion dates of every habit with the given status in a single query.
+    :param status: 'active', 'archived', or 'all'
+    :return: A dict mapping habit id to its completion dates, newest first.
+    """
+    conn = get_db_connection()
+    if status == 'all':
+        rows = conn.execute(
+            "SELECT habit_id, completed_at FROM completions ORDER BY habit_id, completed_at DESC"
+        ).fetchall()
+    else:
+        rows = conn.execute("""
+            SELECT c.habit_id, c.completed_at FROM completions c
+            JOIN habits h ON h.id = c.habit_id
+            WHERE h.status = ?
+            ORDER BY c.habit_id, c.completed_at DESC
+        """, (status,)).fetchall()
+
+    completions_by_habit = {}
+    for row in rows:
+        completions_by_habit.setdefault(row['habit_id'], []).append(row['completed_at'])
+    return completions_by_habit
+
+def iter_completions_by_habit(status: str = 'active', habit_ids: list[int] | None = None):
+    """
+    Streams the completion days of every habit with the given status from a single query,
+    without loading them all at once. Days are integer ordinals (see date.toordinal).
+    :param status: 'active', 'archived', or 'all'
+    :param habit_ids: Optionally restrict the stream to these habits.
+    :return: A generator of (habit id, completion day ordinals newest first), in the display order
+             of get_habits. Habits without completions are skipped.
+    """
     conn = get_db_connection()
-    completions = conn.execute("SELECT completed_at FROM completions WHERE habit_id = ? ORDER BY completed_at DESC", (habit_id,)).fetchall()
-    conn.close()
-    return [row['completed_at'] for row in completions]
+    conditions = [] if status == 'all' else ["h.status = :status"]
+    if habit_ids is not None:
+        conditions.append("c.habit_id IN (SELECT value FROM json_each(:habit_ids))")
+    where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+    cursor = conn.execute(f"""
+        SELECT c.habit_id, c.completed_day FROM completions c
+        JOIN habits h ON h.id = c.habit_id
+        {where}
+        ORDER BY h.created_at, h.id, c.completed_day DESC
+    """, {'status': status, 'habit_ids': json.dumps(habit_ids)})
+    for habit_id, rows in groupby(cursor, key=lambda row: row['habit_id']):
+        yield habit_id, [row['completed_day'] for row in rows]
+
+def compute_habit_stats(completion_dates: list[date]) -> dict:
+    """
+    Computes the materialized stats of a habit from its completion dates (any order).
+    :return: A dict with the same keys as a habit_stats row, minus habit_id.
+    """
+    dates = sorted(set(completion_dates))
+    if not dates:
+        return {'total_completions': 0, 'run_start': None, 'run_end': None, 'longest_streak': 0}
+
+    run_start = dates[0]
+    longest_streak = 1
+    for previous, current in zip(dates, dates[1:]):
+        if current != previous + timedelta(days=1):
+            run_start = current
+        longest_streak = max(longest_streak, (current - run_start).days + 1)
+
+    return {
+        'total_completions': len(dates),
+        'run_start': run_start.isoformat(),
+        'run_end': dates[-1].isoformat(),
+        'longest_streak': longest_streak,
+    }
+
+def _save_habit_stats(conn, habit_id: int, stats: dict):
+    """Writes (inserts or replaces) the stats row of a habit."""
+    conn.execute("""
+        INSERT OR REPLACE INTO habit_stats (habit_id, total_completions, run_start, run_end, longest_streak)
+        VALUES (?, ?, ?, ?, ?)
+    """, (habit_id, stats['total_completions'], stats['run_start'], stats['run_end'], stats['longest_streak']))
+
+def _refresh_habit_stats(conn, habit_id: int):
+    """Recomputes the stats of a single habit from its full completion history."""
+    rows = conn.execute("SELECT completed_day FROM completions WHERE habit_id = ?", (habit_id,)).fetchall()
+    stats = compute_habit_stats([date.fromordinal(row['completed_day']) for row in rows])
+    _save_habit_stats(conn, habit_id, stats)
+
+def _refresh_habits_stats(conn, habit_ids: list[int]):
+    """Recomputes the stats of several habits with one analytics query."""
+    analytics = get_habit_analytics(status='all', habit_ids=list(habit_ids))
+    for habit_id in set(habit_ids):
+        if habit_id in analytics:
+            row = analytics[habit_id]
+            _save_habit_stats(conn, habit_id, {key: row[key] for key in
+                                               ('total_completions', 'run_start', 'run_end', 'longest_streak')})
+        else:
+            _save_habit_stats(conn, habit_id, compute_habit_stats([]))
+
+def _record_completion_stats(conn, habit_id: int, completion_date: date):
+    """
+    Incrementally updates a habit's stats after a new completion was inserted.
+    Completions that extend or follow the most recent run are O(1); a backfilled
+    date inside or before it falls back to recomputing that habit's stats.
+    """
+    row = conn.execute("SELECT * FROM habit_stats WHERE habit_id = ?", (habit_id,)).fetchone()
+    if row is None or row['run_end'] is None:
+        _refresh_habit_stats(conn, habit_id)
+        return
+
+    run_start = date.fromordinal(row['run_start_day'])
+    run_end = date.fromordinal(row['run_end_day'])
+    if completion_date <= run_end:
+        _refresh_habit_stats(conn, habit_id)
+        return
+
+    if completion_date == run_end + timedelta(days=1):
+        run_end = completion_date
+    else:
+        # A gap since the last run: a new run starts today
+        run_start = run_end = completion_date
+
+    _save_habit_stats(conn, habit_id, {
+        'total_completions': row['total_completions'] + 1,
+        'run_start': run_start.isoformat(),
+        'run_end': run_end.isoformat(),
+        'longest_streak': max(row['longest_streak'], (run_end - run_start).days + 1),
+    })
+
+def get_habits_with_stats(status: str = 'active'):
+    """
+    Retrieves habits joined with their materialized stats in a single query.
+    Each habit also gets a 'first_day' (see FIRST_DAY_SQL).
+    :param status: 'active', 'archived', or 'all'
+    """
+    conn = get_db_connection()
+    query = f"""
+        SELECT h.*,
+               COALESCE(s.total_completions, 0) AS total_completions,
+               s.run_start, s.run_end, s.run_start_day, s.run_end_day,
+               COALESCE(s.longest_streak, 0) AS longest_streak,
+               {FIRST_DAY_SQL} AS first_day
+        FROM habits h LEFT JOIN habit_stats s ON s.habit_id = h.id
+    """
+    if status == 'all':
+        return conn.execute(query + " ORDER BY h.created_at, h.id").fetchall()
+    return conn.execute(query + " WHERE h.status = ? ORDER BY h.created_at, h.id", (status,)).fetchall()
+
+# Gaps-and-islands over completions: within a habit, consecutive days share the same
+# (day ordinal - row number) value, so grouping by it yields one row per run of days.
+# The window is partitioned and ordered like idx_completions_habit_day, so SQLite walks
+# that covering index and never parses a date; only the few result days are formatted.
+HABIT_ANALYTICS_QUERY = """
+WITH numbered AS (
+    SELECT habit_id, {day} AS completed_day,
+           {day} - ROW_NUMBER() OVER (PARTITION BY habit_id ORDER BY {day}) AS island
+    FROM completions
+    {where}
+),
+runs AS (
+    SELECT habit_id, MIN(completed_day) AS run_start, MAX(completed_day) AS run_end,
+           COUNT(*) AS run_length
+    FROM numbered
+    GROUP BY habit_id, island
+),
+ranked AS (
+    SELECT runs.*, ROW_NUMBER() OVER (PARTITION BY habit_id ORDER BY run_end DESC) AS recency
+    FROM runs
+),
+analytics AS (
+    SELECT habit_id,
+           SUM(run_length) AS total_completions,
+           MIN(run_start) AS first_completion,
+           MAX(run_end) AS last_completion,
+           MAX(run_length) AS longest_streak,
+           MAX(CASE WHEN recency = 1 THEN run_start END) AS run_start,
+           MAX(CASE WHEN recency = 1 THEN run_end END) AS run_end,
+           MAX(CASE WHEN recency = 1 AND run_end >= :today - 1 THEN run_length ELSE 0 END) AS current_streak
+    FROM ranked
+    GROUP BY habit_id
+)
+SELECT habit_id, total_completions, longest_streak, current_streak,
+       date(first_completion + 1721424.5) AS first_completion,
+       date(last_completion + 1721424.5) AS last_completion,
+       date(run_start + 1721424.5) AS run_start,
+       date(run_end + 1721424.5) AS run_end
+FROM analytics
+"""
+
+def get_habit_analytics(status: str = 'active', today: date | None = None, habit_ids: list[int] | None = None):
+    """
+    Computes streak analytics for all habits with the given status in one SQL statement.
+    This is the SQL-side counterpart of logic.calculate_streak / calculate_longest_streak.
+    :param status: 'active', 'archived', or 'all'
+    :param today: The day current streaks are measured against (defaults to date.today()).
+    :param habit_ids: Optionally restrict the analytics to these habits.
+    :return: A dict mapping habit id to a row with total_completions, first_completion,
+             last_completion, longest_streak, run_start, run_end and current_streak.
+             Habits without completions are absent.
+    """
+    conn = get_db_connection()
+    params = {'today': (today or date.today()).toordinal(), 'status': status, 'habit_ids': json.dumps(habit_ids)}
+    conditions = [] if status == 'all' else ["habit_id IN (SELECT id FROM habits WHERE status = :status)"]
+    if habit_ids is not None:
+        conditions.append("habit_id IN (SELECT value FROM json_each(:habit_ids))")
+    where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+    # A database opened read-only may predate the day ordinals; derive them on the fly then
+    day = "completed_day" if get_schema_version() >= DAY_ORDINALS_VERSION else _day_ordinal_sql("completed_at")
+    rows = conn.execute(HABIT_ANALYTICS_QUERY.format(where=where, day=day), params).fetchall()
+    return {row['habit_id']: row for row in rows}
+
+@retry_on_lock
+def rebuild_habit_stats():
+    """
+    Recomputes every habit's stats from scratch and stores them.
+    :return: A list of (habit_id, stored stats, recomputed stats) for every habit whose
+             stored stats did not match the recomputed ones.
+    """
+    keys = ('total_completions', 'run_start', 'run_end', 'longest_streak')
+    empty = compute_habit_stats([])
+    mismatches = []
+    with db_session() as conn:
+        stored = {row['habit_id']: {key: row[key] for key in keys}
+                  for row in conn.execute("SELECT * FROM habit_stats")}
+        analytics = get_habit_analytics(status='all')
+        for row in conn.execute("SELECT id FROM habits").fetchall():
+            habit_id = row['id']
+            stats = {key: analytics[habit_id][key] for key in keys} if habit_id in analytics else empty
+            if stored.get(habit_id) != stats:
+                mismatches.append((habit_id, stored.get(habit_id), stats))
+            _save_habit_stats(conn, habit_id, stats)
+    return mismatches
+
+# Columns of an exported/imported record: one row per completion, or a single row
+# with an empty completed_at for a habit without completions
+TRANSFER_COLUMNS = ('habit', 'description', 'status', 'created_at', 'completed_at')
+
+def iter_export_rows():
+    """
+    Streams every habit and completion as TRANSFER_COLUMNS tuples, iterating the cursor
+    instead of fetching all rows, in display order and oldest completion first.
+    """
+    conn = get_db_connection()
+    cursor = conn.execute("""
+        SELECT h.name, h.description, h.status, h.created_at, c.completed_at
+        FROM habits h LEFT JOIN completions c ON c.habit_id = h.id
+        ORDER BY h.created_at, h.id, c.completed_at
+    """)
+    for row in cursor:
+        yield tuple(row)
+
+def import_records(records, chunk_size: int = 10000):
+    """
+    Imports TRANSFER_COLUMNS dicts, creating habits by name as needed.
+    Completions are inserted with executemany in one transaction per chunk, and
+    INSERT OR IGNORE skips those already recorded (enforced by idx_habit_date).
+    New habits keep the record's created_at, or are created now if it has none.
+    Stats are rebuilt afterwards, even if a bad record stops the import partway.
+    :return: A (habits created, completion rows read, completions inserted) tuple.
+    """
+    conn = get_db_connection()
+    habit_ids = {}
+    for row in conn.execute("SELECT id, name FROM habits ORDER BY created_at DESC, id DESC"):
+        habit_ids[row['name']] = row['id'] # The oldest habit wins if names repeat
+
+    habits_created = completions_read = completions_inserted = 0
+    chunk = []
+    today = date.today()
+
+    @retry_on_lock
+    def flush():
+        nonlocal completions_inserted
+        with db_session() as conn:
+            before = conn.total_changes
+            conn.executemany("INSERT OR IGNORE INTO completions (habit_id, completed_at) VALUES (?, ?)", chunk)
+            completions_inserted += conn.total_changes - before
+        chunk.clear()
+
+    try:
+        for record in records:
+            name = record.get('habit')
+            if not name:
+                raise ValueError(f"Record without a habit name: {record!r}")
+
+            if name not in habit_ids:
+                if record.get('status') not in (None, '', 'active', 'archived'):
+                    raise ValueError(f"Invalid status {record['status']!r} for habit {name!r}")
+                created_at = None
+                if record.get('created_at'):
+                    try:
+                        created_at = datetime.fromisoformat(record['created_at']).strftime("%Y-%m-%d %H:%M:%S")
+                    except ValueError:
+                        raise ValueError(f"Invalid created_at {record['created_at']!r} for habit {name!r}") from None
+                with db_session() as conn:
+                    cursor = conn.execute(
+                        "INSERT INTO habits (name, description, status, created_at) "
+                        "VALUES (?, ?, ?, COALESCE(?, CURRENT_TIMESTAMP))",
+                        (name, record.get('description') or "", record.get('status') or 'active', created_at)
+                    )
+                    conn.execute("INSERT INTO habit_stats (habit_id) VALUES (?)", (cursor.lastrowid,))
+                habit_ids[name] = cursor.lastrowid
+                habits_created += 1
+
+            if record.get('completed_at'):
+                # Normalise (and validate) the date to the ISO format the rest of the app expects
+                completed_at = date.fromisoformat(record['completed_at'][:10])
+                if completed_at > today:
+                    # Like 'habit done': streaks and 'done today' assume no completion lies ahead
+                    raise ValueError(f"Completion in the future ({completed_at}) for habit {name!r}")
+                chunk.append((habit_ids[name], completed_at.isoformat()))
+                completions_read += 1
+                if len(chunk) >= chunk_size:
+                    flush()
+
+        if chunk:
+            flush()
+    finally:
+        # Chunks committed before an error must not be left with stale stats
+        if completions_inserted:
+            rebuild_habit_stats()
+    return habits_created, completions_read, completions_inserted
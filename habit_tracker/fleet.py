@@ -0,0 +1,135 @@
+"""
+Fleet summary: aggregate statistics over a directory of habit databases.
+
+Each database is opened read-only and summarized by a worker process, which
+returns a small dict of plain numbers; the parent only merges those, so the
+work spreads over all cores and no database is ever loaded into the parent.
+Databases from older versions are read as they are, never migrated.
+"""
+import os
+import sqlite3
+from datetime import date
+from pathlib import Path
+
+from . import db_manager
+
+# Percentiles reported for every fleet-wide distribution
+PERCENTILES = (10, 50, 90)
+# Databases handed to a worker at a time, per worker process
+CHUNKS_PER_JOB = 8
+
+
+def find_databases(directory) -> list[Path]:
+    """Returns every '*.db' file below directory, in a stable order."""
+    return sorted(path for path in Path(directory).rglob("*.db") if path.is_file())
+
+def database_stats(path, today: date) -> dict:
+    """
+    Summarizes one habit database, opened read-only; runs in the worker processes.
+    :return: A dict of counts for the database and the current streak of each active habit,
+             or one with an 'error' if the file could not be read as a habit database.
+    """
+    stats = {'path': str(path)}
+    db_manager.set_db_path(path, read_only=True)
+    try:
+        stats.update(_summarize(db_manager.get_habits(status='all'),
+                                db_manager.get_habit_analytics(status='active', today=today), today))
+    except (sqlite3.Error, ValueError, TypeError) as error:
+        # Not a habit database, or one with malformed rows: report it and carry on with the rest
+        stats['error'] = str(error)
+    finally:
+        db_manager.close_db_connection()
+    return stats
+
+def _summarize(habits, analytics: dict, today: date) -> dict:
+    """Reduces one database's habits and their analytics rows to the counts database_stats returns."""
+    active = [habit for habit in habits if habit['status'] == 'active']
+    completions = possible = done_today = longest = 0
+    streaks = []
+    for habit in active:
+        row = analytics.get(habit['id'])
+        # Count days from the first completion if it was backfilled before creation
+        first = date.fromisoformat(habit['created_at'][:10])
+        if row:
+            first = min(first, date.fromisoformat(row['first_completion']))
+        possible += max((today - first).days + 1, 1)
+        streaks.append(row['current_streak'] if row else 0)
+        if row:
+            completions += row['total_completions']
+            done_today += row['last_completion'] == today.isoformat()
+            longest = max(longest, row['longest_streak'])
+
+    return {
+        'active': len(active),
+        'archived': len(habits) - len(active),
+        'completions': completions,
+        'done_today': done_today,
+        'longest_streak': longest,
+        'completion_rate': completions / possible * 100.0 if possible else 0.0,
+        'streaks': streaks,
+    }
+
+def iter_database_stats(paths: list[Path], today: date, jobs: int = 1):
+    """Yields database_stats for every path, in order, computed by `jobs` worker processes."""
+    if jobs <= 1 or len(paths) <= 1:
+        own_database = db_manager.DB_PATH
+        try:
+            for path in paths:
+                yield database_stats(path, today)
+        finally:
+            db_manager.set_db_path(own_database)
+        return
+
+    chunksize = max(1, len(paths) // (jobs * CHUNKS_PER_JOB))
+    with db_manager.process_pool(jobs) as executor:
+        yield from executor.map(database_stats, paths, [today] * len(paths), chunksize=chunksize)
+
+def percentiles(values: list[float]) -> dict:
+    """Returns the nearest-rank PERCENTILES of values (all 0 if there are none)."""
+    ordered = sorted(values)
+    if not ordered:
+        return {percentile: 0 for percentile in PERCENTILES}
+    return {percentile: ordered[max(-(-percentile * len(ordered) // 100) - 1, 0)] for percentile in PERCENTILES}
+
+def get_fleet_summary(directory, jobs: int | None = None, today: date | None = None) -> dict:
+    """
+    Summarizes every habit database below directory and merges the results.
+    :param jobs: Worker processes to use; defaults to one per CPU.
+    :return: A dict with the per-database stats ('databases', ordered by path), the unreadable
+             files ('failed'), fleet-wide 'totals' and 'percentiles' of the per-database
+             completion rate and done-today share and of every active habit's current streak.
+    """
+    today = today or date.today()
+    paths = find_databases(directory)
+    jobs = jobs or os.cpu_count() or 1
+
+    databases, failed = [], []
+    totals = {'databases': 0, 'active': 0, 'archived': 0, 'completions': 0, 'done_today': 0, 'longest_streak': 0}
+    streaks = []
+    root = Path(directory)
+    for stats in iter_database_stats(paths, today, jobs):
+        stats['name'] = str(Path(stats['path']).relative_to(root))
+        if 'error' in stats:
+            failed.append(stats)
+            continue
+        # Per-habit streaks only feed the fleet-wide percentiles; each database keeps its counts
+        streaks.extend(stats.pop('streaks'))
+        stats['done_today_share'] = stats['done_today'] / stats['active'] * 100.0 if stats['active'] else 0.0
+        databases.append(stats)
+        totals['databases'] += 1
+        for key in ('active', 'archived', 'completions', 'done_today'):
+            totals[key] += stats[key]
+        totals['longest_streak'] = max(totals['longest_streak'], stats['longest_streak'])
+
+    return {
+        'generation_date': today.strftime("%B %d, %Y"),
+        'directory': str(root.resolve()),
+        'databases': databases,
+        'failed': failed,
+        'totals': totals,
+        'percentiles': {
+            'completion_rate': percentiles([stats['completion_rate'] for stats in databases]),
+            'done_today_share': percentiles([stats['done_today_share'] for stats in databases]),
+            'current_streak': percentiles(streaks),
+        },
+    }
@@ -0,0 +1,88 @@
+"""
+Heatmap engine for the HTML report: one compact status string per habit.
+
+A heatmap covers whole weeks, Monday to Sunday, from the week containing the
+start of the range to the week containing today, laid out column by column like
+GitHub's contribution grid. Every habit in a report shares that geometry, so it
+is computed once (heatmap_grid); each habit then only needs its status string
+(heatmap_statuses), one character per cell in day order:
+
+    'c' completed   'm' missed   'b' before the habit was created
+    'f' future      'o' outside the requested range
+"""
+import calendar
+import re
+from datetime import date, timedelta
+
+COMPLETED, MISSED, BEFORE_CREATION, FUTURE, OUTSIDE = 'c', 'm', 'b', 'f', 'o'
+
+# CompletionHistory.day_flags characters -> status characters
+_FLAG_STATUSES = str.maketrans({'1': COMPLETED, '0': MISSED})
+
+_RANGE_PATTERN = re.compile(r"^(\d+)([dwmy])$")
+
+
+def parse_range(spec: str, today: date) -> date:
+    """
+    Returns the first day of a range ending today, given as a count and a unit:
+    '90d', '12w', '6m' or '2y'. '1y' starts the day after the same date a year ago.
+    :raises ValueError: If the spec is not in that form.
+    """
+    match = _RANGE_PATTERN.match(spec.strip().lower())
+    if not match or int(match.group(1)) < 1:
+        raise ValueError(f"Invalid range {spec!r}: use a count and d, w, m or y, e.g. '2y'")
+    count, unit = int(match.group(1)), match.group(2)
+    if unit in 'dw':
+        return today - timedelta(days=count * (7 if unit == 'w' else 1) - 1)
+
+    months = count * (12 if unit == 'y' else 1)
+    year, month = divmod(today.year * 12 + today.month - 1 - months, 12)
+    if year < 1:
+        raise ValueError(f"Invalid range {spec!r}: it starts before year 1")
+    # Clamp e.g. March 31st minus one month to the last day of February
+    day = min(today.day, calendar.monthrange(year, month + 1)[1])
+    return date(year, month + 1, day) + timedelta(days=1)
+
+def heatmap_grid(start: date, today: date) -> dict:
+    """
+    Returns the geometry shared by every habit's heatmap from start to today:
+    the first and last day of the grid, its number of weeks (columns) and the
+    (column, label) of each month, placed at the first week it appears in.
+    Days are stored as ordinals (see date.toordinal), so the grid only holds plain
+    values and a summary containing it can be kept in the snapshot cache.
+    """
+    first_day = start - timedelta(days=start.weekday())
+    last_day = today + timedelta(days=6 - today.weekday())
+    weeks = ((last_day - first_day).days + 1) // 7
+
+    months = []
+    month = date(start.year, start.month, 1)
+    while month <= today:
+        column = (max(month, start) - first_day).days // 7 + 1
+        # A label needs room: drop a leading month that has less than two columns of its own
+        if months and column - months[-1][0] < 2:
+            months.pop()
+        label = month.strftime("%b %Y") if not months or month.month == 1 else month.strftime("%b")
+        months.append((column, label))
+        month = date(month.year + month.month // 12, month.month % 12 + 1, 1)
+
+    return {'start': start.toordinal(), 'today': today.toordinal(), 'first_day': first_day.toordinal(),
+            'last_day': last_day.toordinal(), 'start_label': start.strftime("%B %d, %Y"),
+            'weeks': weeks, 'months': months}
+
+def heatmap_statuses(history, created: date, grid: dict) -> str:
+    """
+    Returns a habit's status string over the grid, one character per day.
+    :param history: The habit's CompletionHistory.
+    :param created: The day the habit was created.
+    """
+    start, today, first_day = (date.fromordinal(grid[key]) for key in ('start', 'today', 'first_day'))
+    cells = grid['last_day'] - grid['first_day'] + 1
+    days = history.day_flags(start, today).translate(_FLAG_STATUSES)
+
+    # Before its creation a habit can only have backfilled completions; the rest is not a miss
+    before_creation = min(max((created - start).days, 0), len(days))
+    days = days[:before_creation].replace(MISSED, BEFORE_CREATION) + days[before_creation:]
+
+    leading = (start - first_day).days
+    return OUTSIDE * leading + days + FUTURE * (cells - leading - len(days))
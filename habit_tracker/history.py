@@ -0,0 +1,115 @@
+from datetime import date, timedelta
+
+
+class CompletionHistory:
+    """
+    A compact record of the days a habit was completed.
+    Days are stored as bits of a single integer: bit i is set if the habit
+    was completed on `anchor + i days`. The anchor is the habit's creation
+    day (or its earliest completion, if that is older).
+    """
+    __slots__ = ('anchor', 'bits')
+
+    def __init__(self, anchor: date, bits: int = 0):
+        self.anchor = anchor
+        self.bits = bits
+
+    @classmethod
+    def from_dates(cls, completions: list[date], anchor: date):
+        """Builds a history from completion dates in any order."""
+        return cls.from_ordinals([day.toordinal() for day in completions], anchor)
+
+    @classmethod
+    def from_ordinals(cls, completions: list[int], anchor: date):
+        """Builds a history from completion day ordinals (date.toordinal) in any order."""
+        start = anchor.toordinal()
+        if completions:
+            start = min(start, min(completions))
+        return cls(date.fromordinal(start), _bits_from_offsets([day - start for day in completions]))
+
+    def _offset(self, day: date) -> int:
+        return day.toordinal() - self.anchor.toordinal()
+
+    def _window(self, start: date, end: date) -> tuple[int, int]:
+        """Returns (bits, length) for the days from start to end inclusive, bit 0 being start."""
+        length = self._offset(end) - self._offset(start) + 1
+        if length <= 0:
+            return 0, 0
+        offset = self._offset(start)
+        bits = self.bits >> offset if offset >= 0 else self.bits << -offset
+        return bits & ((1 << length) - 1), length
+
+    def __len__(self) -> int:
+        return self.bits.bit_count()
+
+    def last_completion(self) -> date | None:
+        """Returns the most recent completion day, or None if there are none."""
+        if not self.bits:
+            return None
+        return self.anchor + timedelta(days=self.bits.bit_length() - 1)
+
+    def run_ending_at(self, day: date) -> int:
+        """Returns the number of consecutive completed days ending on `day`."""
+        bits, length = self._window(self.anchor, day)
+        missed = ~bits & ((1 << length) - 1)
+        return length - missed.bit_length()
+
+    def current_streak(self, today: date) -> int:
+        """
+        Returns the current streak: the run of completed days ending today or yesterday.
+        Mirrors logic.calculate_streak, including returning 0 if there are future completions.
+        """
+        last = self.last_completion()
+        if last is None or last < today - timedelta(days=1) or last > today:
+            return 0
+        return self.run_ending_at(last)
+
+    def longest_streak(self) -> int:
+        """Returns the longest run of consecutive completed days."""
+        if not self.bits:
+            return 0
+        return max(len(run) for run in bin(self.bits)[2:].split('0'))
+
+    def count_between(self, start: date, end: date) -> int:
+        """Returns the number of completed days from start to end inclusive."""
+        bits, _ = self._window(start, end)
+        return bits.bit_count()
+
+    def day_flags(self, start: date, end: date) -> str:
+        """
+        Returns one character per day from start to end inclusive, oldest first:
+        '1' if the habit was completed that day, '0' if not. Built by integer formatting,
+        so it costs a few C-level passes rather than one Python step per day.
+        """
+        bits, length = self._window(start, end)
+        if length == 0:
+            return ""
+        return format(bits, f"0{length}b")[::-1]
+
+    def missed_ranges(self, start: date, end: date) -> list[tuple[date, date]]:
+        """
+        Returns the gaps from start to end inclusive as merged (first, last) day ranges,
+        oldest first. The cost grows with the number of gaps, not the number of days.
+        """
+        bits, length = self._window(start, end)
+        missed = ~bits & ((1 << length) - 1)
+        ranges = []
+        while missed:
+            first = (missed & -missed).bit_length() - 1
+            # The gap ends where the shifted run of set bits does: count its trailing ones
+            run = missed >> first
+            run_length = ((run + 1) & -(run + 1)).bit_length() - 1
+            ranges.append((start + timedelta(days=first), start + timedelta(days=first + run_length - 1)))
+            missed &= ~(((1 << run_length) - 1) << first)
+        return ranges
+
+
+def _bits_from_offsets(offsets: list[int]) -> int:
+    """Packs non-negative day offsets into an integer bitset in linear time."""
+    if not offsets:
+        return 0
+    size = max(offsets) + 1
+    digits = bytearray(b'0' * size)
+    for offset in offsets:
+        digits[size - 1 - offset] = ord('1')
+    return int(digits, 2)
@@ -1,22 +1,20 @@
 from datetime import date, timedelta
-from . import db_manager
-import calendar
+from . import db_manager, profiling
+from .heatmap import heatmap_grid, heatmap_statuses, parse_range
+from .history import CompletionHistory
 from datetime import datetime, date, timedelta
 
 
-def calculate_streak(habit_id: int) -> int:
+@profiling.timed
+def calculate_streak(completions: list[date]) -> int:
     """
-    Calculates the current streak for a given habit.
+    Calculates the current streak from a habit's completion dates (newest first).
     A streak is the number of consecutive days a habit has been completed,
     ending either today or yesterday.
     """
-    completions_str = db_manager.get_completions(habit_id)
-    if not completions_str:
+    if not completions:
         return 0
 
-    # Convert string dates from DB to date objects
-    completions = [date.fromisoformat(d) for d in completions_str]
-
     today = date.today()
     yesterday = today - timedelta(days=1)
     
@@ -38,21 +36,76 @@ def calculate_streak(habit_id: int) -> int:
             
     return streak
 
+@profiling.timed
+def streak_from_run(run_start_day: int | None, run_end_day: int | None) -> int:
+    """
+    Calculates the current streak from the most recent run stored in habit_stats,
+    given as day ordinals. The run only counts as a streak if it ends today or yesterday.
+    """
+    if run_end_day is None or run_end_day < date.today().toordinal() - 1:
+        return 0
+    return run_end_day - run_start_day + 1
+
+# Results kept between requests by a long-running process ('habit serve'), or None.
+# Maps a key to (today, data fingerprint, result); see enable_stats_index.
+_stats_index = None
+
+def enable_stats_index():
+    """
+    Keeps enriched habit lists and summaries in memory for the rest of the process.
+    An entry is reused until the date or the database's data changes.
+    """
+    global _stats_index
+    _stats_index = {}
+
+# Whether results are also kept in the on-disk snapshot cache; see enable_snapshot_cache
+_snapshot_cache = False
+
+def enable_snapshot_cache():
+    """
+    Reuses enriched habit lists and summaries across processes through the snapshot
+    cache file, until the next write to the database or the next day.
+    """
+    global _snapshot_cache
+    _snapshot_cache = True
+
+def _indexed(key, compute):
+    """Returns compute() through the in-memory stats index or the snapshot cache, if enabled."""
+    if _stats_index is None:
+        if not _snapshot_cache:
+            return compute()
+        from . import snapshot
+        validity = (db_manager.get_write_count(), date.today().toordinal())
+        result = snapshot.lookup(key, validity)
+        if result is snapshot.MISSING:
+            result = compute()
+            snapshot.store(key, result, validity)
+        return result
+
+    today, fingerprint = date.today(), db_manager.data_fingerprint()
+    entry = _stats_index.get(key)
+    if entry is None or entry[0] != today or entry[1] != fingerprint:
+        entry = _stats_index[key] = (today, fingerprint, compute())
+    return entry[2]
+
+@profiling.timed
 def get_enriched_habits_data(status: str = 'active'):
     """
     Retrieves habits and enriches them with streak and completion status for today.
     """
-    habits = db_manager.get_habits(status=status)
+    return _indexed(('enriched', status), lambda: _get_enriched_habits_data(status))
+
+def _get_enriched_habits_data(status: str):
+    habits = db_manager.get_habits_with_stats(status=status)
     enriched_data = []
     
-    today_str = date.today().isoformat()
+    today = date.today().toordinal()
 
     for habit in habits:
         habit_dict = dict(habit)
-        completions = db_manager.get_completions(habit['id'])
         
-        habit_dict['streak'] = calculate_streak(habit['id'])
-        habit_dict['done_today'] = today_str in completions
+        habit_dict['streak'] = streak_from_run(habit['run_start_day'], habit['run_end_day'])
+        habit_dict['done_today'] = habit['run_end_day'] == today
         
         enriched_data.append(habit_dict)
         
@@ -62,113 +115,213 @@ def get_enriched_habits_data(status: str = 'active'):
 
 
 
-def get_missed_dates(habit: dict, completions: list[date]) -> list[date]:
-    """Calculates the list of dates a habit was missed."""
-    created_at_str = habit['created_at'].split(" ")[0] # Get 'YYYY-MM-DD' part
-    created_date = date.fromisoformat(created_at_str)
+@profiling.timed
+def get_missed_ranges(habit: dict, history: CompletionHistory) -> list[tuple[date, date]]:
+    """
+    Calculates the days a habit was missed, from its first tracked day until yesterday,
+    as merged (first, last) date ranges, newest first.
+    """
+    first_date = date.fromordinal(habit['first_day'])
     today = date.today()
     
-    # Create a set of completion dates for fast lookups
-    completion_set = set(completions)
-    
-    missed_dates = []
-    # Iterate through each day from creation until today
-    current_day = created_date
-    while current_day < today:
-        if current_day not in completion_set:
-            missed_dates.append(current_day)
-        current_day += timedelta(days=1)
-        
-    return missed_dates
+    # The unset bits of the history between that day and yesterday are the missed days
+    return history.missed_ranges(first_date, today - timedelta(days=1))[::-1]
 
-def generate_calendar_view(habit: dict, completions: list[date], year: int, month: int) -> list[list[dict]]:
+def iter_history_rollup(completions, period: str, first_day: date, last_day: date):
     """
-    Generates a calendar grid for a given month and habit.
-    Each day is a dict with its number and status.
+    Rolls a habit's completion dates (ISO strings, newest first, e.g. a db_manager.iter_completions
+    stream) up into weeks or months, consuming the stream as it goes.
+    Every period from last_day back to first_day is included, even without completions,
+    as are older periods still holding completions. Completions after last_day are skipped.
+    :param period: 'week' (Monday to Sunday) or 'month'.
+    :return: A generator of (label, completed days, days in range) tuples, newest first.
     """
-    cal = calendar.monthcalendar(year, month)
-    today = date.today()
-    created_at_str = habit['created_at'].split(" ")[0]
-    created_date = date.fromisoformat(created_at_str)
-    completion_set = set(completions)
-    
-    calendar_grid = []
-    for week in cal:
-        week_data = []
-        for day_num in week:
-            if day_num == 0:
-                # This is a placeholder for a day not in the current month
-                week_data.append({'day': None, 'status': 'empty'})
-                continue
-
-            current_date = date(year, month, day_num)
-            status = ''
-            if current_date > today:
-                status = 'future'
-            elif current_date < created_date:
-                status = 'before_creation'
-            elif current_date in completion_set:
-                status = 'completed'
-            else:
-                status = 'missed'
-            
-            week_data.append({'day': day_num, 'status': status})
-        calendar_grid.append(week_data)
-        
-    return calendar_grid
+    completions = iter(completions)
+    pending = next(completions, None)
+    last_str = last_day.isoformat()
+    while pending is not None and pending > last_str:
+        pending = next(completions, None)
+    end = last_day
+    while end >= first_day or pending is not None:
+        if period == 'week':
+            start = end - timedelta(days=end.weekday())
+            year, week, _ = start.isocalendar()
+            label = f"{year}-W{week:02d}"
+        else:
+            start = end.replace(day=1)
+            label = start.strftime("%Y-%m")
+
+        completed = 0
+        start_str = start.isoformat()
+        while pending is not None and pending >= start_str:
+            completed += 1
+            pending = next(completions, None)
+
+        days = (end - (max(start, first_day) if end >= first_day else start)).days + 1
+        yield label, min(completed, days), days
+        end = start - timedelta(days=1)
 
 
-# This will be our NEW master data function, replacing the old one
-# This will be our FINAL master data function
-def get_summary_data():
+def _summary_history(habit: dict, context: dict) -> CompletionHistory:
     """
-    Retrieves and enriches all data needed for the HTML summary,
-    including stats, missed dates, and calendar views.
+    Returns a habit's completion history for the summary.
+    Completions are streamed from one query in display order, so only the
+    current habit's history is held in memory.
     """
-    habits = db_manager.get_habits(status='active')
-    summary_data = []
+    if context.get('history_habit_id') != habit['id']:
+        if 'completions_stream' not in context:
+            context['completions_stream'] = db_manager.iter_completions_by_habit(
+                status='active', habit_ids=context.get('habit_ids')
+            )
+            context['pending_completions'] = next(context['completions_stream'], None)
+
+        # Skip the completions of habits before this one that did not ask for a history
+        position = context['positions'][habit['id']]
+        pending = context['pending_completions']
+        while pending is not None and context['positions'].get(pending[0], -1) < position:
+            pending = next(context['completions_stream'], None)
+
+        completion_days = []
+        if pending is not None and pending[0] == habit['id']:
+            completion_days = pending[1]
+            pending = next(context['completions_stream'], None)
+        context['pending_completions'] = pending
+
+        created_date = date.fromordinal(habit['created_day'])
+        context['history'] = CompletionHistory.from_ordinals(completion_days, created_date)
+        context['history_habit_id'] = habit['id']
+    return context['history']
+
+def _summary_total_possible(habit: dict, context: dict) -> int:
+    """Number of days the habit has been tracked (see calculate_completion_rate), including today."""
+    first_date = date.fromordinal(habit['first_day'])
+    return max((context['today'] - first_date).days + 1, 1)
+
+def _summary_missed_days(habit: dict, context: dict) -> int:
+    """Number of days the habit was missed, from its first tracked day until yesterday."""
+    first_date = date.fromordinal(habit['first_day'])
+    yesterday = context['today'] - timedelta(days=1)
+    days = (yesterday - first_date).days + 1
+    return max(days, 0) - _summary_history(habit, context).count_between(first_date, yesterday)
+
+# Period the report heatmaps cover unless another range is asked for
+DEFAULT_HEATMAP_RANGE = '1y'
+
+# Fields get_summary_data can add to each habit, mapped to the function computing them.
+# Cheap fields are read from the habit_stats join; 'missed_ranges', 'missed_days' and 'heatmap'
+# need the full completion history and are only computed when requested.
+SUMMARY_FIELDS = {
+    'period': lambda habit, context: habit['periodicity'],
+    'current_streak': lambda habit, context: streak_from_run(habit['run_start_day'], habit['run_end_day']),
+    'longest_streak': lambda habit, context: habit['longest_streak'],
+    'total_completions': lambda habit, context: habit['total_completions'],
+    'completion_rate': lambda habit, context: calculate_completion_rate(habit, habit['total_completions']),
+    'total_checks': lambda habit, context: habit['total_completions'],
+    'total_possible': _summary_total_possible,
+    'missed_ranges': lambda habit, context: get_missed_ranges(habit, _summary_history(habit, context)),
+    'missed_days': _summary_missed_days,
+    'heatmap': lambda habit, context: heatmap_statuses(
+        _summary_history(habit, context), date.fromordinal(habit['created_day']), context['heatmap']
+    ),
+}
+
+@profiling.timed
+def get_summary_data(fields=None, lazy: bool = False, jobs: int = 1, heatmap_range: str = DEFAULT_HEATMAP_RANGE):
+    """
+    Retrieves and enriches the data needed for a summary report.
+    :param fields: The names of the SUMMARY_FIELDS to compute for each habit.
+                   Defaults to all of them; fields that are not requested are never computed.
+    :param lazy: If True, 'habits' is a generator that computes each habit when it is
+                 consumed, so a report can be streamed without holding every habit at once.
+    :param jobs: Number of worker processes to compute habits in; 1 computes them in-process.
+    :param heatmap_range: The period the 'heatmap' field covers, ending today (see heatmap.parse_range).
+    """
+    fields = list(SUMMARY_FIELDS) if fields is None else list(fields)
+    unknown = set(fields) - set(SUMMARY_FIELDS)
+    if unknown:
+        raise ValueError(f"Unknown summary fields: {', '.join(sorted(unknown))}")
+
+    if not lazy and jobs == 1:
+        return _indexed(('summary', tuple(fields), heatmap_range),
+                        lambda: _get_summary_data(fields, lazy, jobs, heatmap_range))
+    return _get_summary_data(fields, lazy, jobs, heatmap_range)
+
+def _get_summary_data(fields: list[str], lazy: bool, jobs: int, heatmap_range: str):
+    habits = db_manager.get_habits_with_stats(status='active')
     
-    # Generate calendar for the current month
     today = date.today()
-    current_year, current_month = today.year, today.month
+    shared = {'today': today}
+    if 'heatmap' in fields:
+        # Every habit's heatmap shares one grid, laid out once for the whole report
+        shared['heatmap'] = heatmap_grid(parse_range(heatmap_range, today), today)
 
-    for habit in habits:
-        habit_dict = dict(habit)
+    if jobs > 1 and len(habits) > 1:
+        summary_data = _iter_parallel_summary_habits(habits, fields, shared, jobs)
+    else:
+        context = dict(shared, positions={habit['id']: i for i, habit in enumerate(habits)})
+        summary_data = _iter_summary_habits(habits, fields, context)
+    if not lazy:
+        summary_data = list(summary_data)
         
-        # Fetch completions and convert to date objects
-        completions_str = db_manager.get_completions(habit['id'])
-        completions_dates = [date.fromisoformat(d) for d in completions_str]
-        
-        # Add all the stats needed for the template
-        habit_dict['current_streak'] = calculate_streak(habit['id'])
-        habit_dict['longest_streak'] = calculate_longest_streak(habit['id'])
-        habit_dict['completion_rate'] = calculate_completion_rate(habit_dict)
-        habit_dict['total_completions'] = len(completions_dates)
-        
-        # Add missed dates and calendar view
-        habit_dict['missed_dates'] = get_missed_dates(habit_dict, completions_dates)
-        habit_dict['calendar'] = generate_calendar_view(habit_dict, completions_dates, current_year, current_month)
-        
-        summary_data.append(habit_dict)
-        
-    # We pass month/year names to the template for the title
+    # We pass the heatmap layout to the template for the grids and their month labels
     overall_context = {
         'habits': summary_data,
         'generation_date': today.strftime("%B %d, %Y"),
-        'calendar_month': today.strftime("%B"),
-        'calendar_year': today.year
+        'heatmap': shared.get('heatmap'),
+        'heatmap_range': heatmap_range,
     }
     return overall_context
 
-def calculate_longest_streak(habit_id: int) -> int:
+def _iter_summary_habits(habits, fields, context):
+    """Yields each habit as a dict enriched with the requested summary fields."""
+    for habit in habits:
+        # Timed per habit: a lazy summary computes habits while the report renders
+        with profiling.phase("logic.summary_habit"):
+            habit_dict = dict(habit)
+            for field in fields:
+                habit_dict[field] = SUMMARY_FIELDS[field](habit_dict, context)
+        yield habit_dict
+
+# Shards per worker process, so that a few expensive shards do not leave other workers idle
+SHARDS_PER_JOB = 4
+
+def _summary_shard(db_path, habits: list[dict], fields: list[str], shared: dict) -> list[dict]:
+    """Computes the summary of one shard of habits in a worker process, reading the database read-only."""
+    db_manager.set_db_path(db_path, read_only=True)
+    context = dict(
+        shared,
+        positions={habit['id']: i for i, habit in enumerate(habits)},
+        habit_ids=[habit['id'] for habit in habits],
+    )
+    return list(_iter_summary_habits(habits, fields, context))
+
+def _iter_parallel_summary_habits(habits, fields, shared: dict, jobs: int):
+    """
+    Computes the summary of contiguous shards of habits in a process pool and
+    yields the habits in their original order, exactly like _iter_summary_habits.
+    """
+    habits = [dict(habit) for habit in habits]
+    shard_count = min(len(habits), jobs * SHARDS_PER_JOB)
+    size = -(-len(habits) // shard_count)
+    shards = [habits[i:i + size] for i in range(0, len(habits), size)]
+
+    with db_manager.process_pool(jobs) as executor:
+        results = executor.map(
+            _summary_shard,
+            [db_manager.DB_PATH] * len(shards), shards, [fields] * len(shards), [shared] * len(shards)
+        )
+        for shard in results:
+            yield from shard
+
+@profiling.timed
+def calculate_longest_streak(completions: list[date]) -> int:
     """
     Calculates the longest streak of consecutive completion days for a habit.
     """
-    completions_str = db_manager.get_completions(habit_id)
-    if not completions_str:
+    if not completions:
         return 0
 
-    completions = sorted([date.fromisoformat(d) for d in completions_str]) # Sort oldest to newest
+    completions = sorted(completions) # Sort oldest to newest
 
     if not completions:
         return 0
@@ -191,19 +344,18 @@ def calculate_longest_streak(habit_id: int) -> int:
             
     return longest_streak
 
-def calculate_completion_rate(habit: dict) -> float:
+@profiling.timed
+def calculate_completion_rate(habit: dict, total_completions: int) -> float:
     """
-    Calculates the percentage of days a habit was completed since its creation.
+    Calculates the percentage of days a habit was completed since its creation,
+    or since its first completion if days before its creation were backfilled.
     """
-    created_at_str = habit['created_at'].split(" ")[0]
-    created_date = date.fromisoformat(created_at_str)
+    first_date = date.fromordinal(habit['first_day'])
     today = date.today()
     
-    # Calculate the number of days the habit has existed
-    days_since_creation = (today - created_date).days + 1
+    # Calculate the number of days the habit has been tracked
+    days_since_creation = (today - first_date).days + 1
     if days_since_creation <= 0:
         return 100.0 # Habit created today is 100% complete if done, 0% otherwise
 
-    total_completions = len(db_manager.get_completions(habit['id']))
-
     return (total_completions / days_since_creation) * 100.0
\ No newline at end of file
@@ -0,0 +1,184 @@
+import json
+import os
+import sqlite3
+import sys
+import time
+from contextlib import contextmanager
+from functools import wraps
+
+# Environment variable that turns profiling on and dumps the breakdown as JSON:
+# a file path appends one JSON line per command, '1' or '-' writes it to stderr.
+TRACE_ENV_VAR = "HABIT_TRACE"
+
+enabled = False
+
+# phase name -> [calls, seconds, self seconds], the latter excluding nested phases and SQL
+_phases = {}
+# SQL text -> [executions, seconds]
+_statements = {}
+# Time spent in nested phases and SQL, one entry per phase currently running
+_nested = []
+# Things worth knowing about the run that are not timings, e.g. a result left uncached
+_notes = []
+
+
+def enable():
+    """Turns on collection of phase and query timings for the rest of the process."""
+    global enabled
+    enabled = True
+
+def trace_requested() -> bool:
+    """Returns True if the HABIT_TRACE environment variable asks for a JSON dump."""
+    return bool(os.environ.get(TRACE_ENV_VAR))
+
+def note(message: str):
+    """Adds a message to the report (a no-op unless enabled)."""
+    if enabled:
+        _notes.append(message)
+
+def _record(table: dict, key: str, seconds: float, calls: int = 1):
+    entry = table.setdefault(key, [0, 0.0])
+    entry[0] += calls
+    entry[1] += seconds
+
+def _record_nested(seconds: float):
+    """Counts time spent in a nested phase or statement against the enclosing phase."""
+    if _nested:
+        _nested[-1] += seconds
+
+def _end_phase(name: str, start: float):
+    seconds = time.perf_counter() - start
+    self_seconds = seconds - _nested.pop()
+    entry = _phases.setdefault(name, [0, 0.0, 0.0])
+    entry[0] += 1
+    entry[1] += seconds
+    entry[2] += self_seconds
+    _record_nested(seconds)
+
+@contextmanager
+def phase(name: str):
+    """Times the enclosed block under the given phase name (a no-op unless enabled)."""
+    if not enabled:
+        yield
+        return
+    _nested.append(0.0)
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        _end_phase(name, start)
+
+def timed(func):
+    """Decorator timing every call of a function as the phase '<module>.<function>'."""
+    name = f"{func.__module__.rsplit('.', 1)[-1]}.{func.__name__}"
+
+    @wraps(func)
+    def wrapper(*args, **kwargs):
+        if not enabled:
+            return func(*args, **kwargs)
+        _nested.append(0.0)
+        start = time.perf_counter()
+        try:
+            return func(*args, **kwargs)
+        finally:
+            _end_phase(name, start)
+    return wrapper
+
+
+class TracedCursor(sqlite3.Cursor):
+    """Cursor that adds the time spent executing and fetching to its statement's total."""
+    _sql = ""
+
+    def _timed(self, sql, call, *args):
+        start = time.perf_counter()
+        try:
+            return call(*args)
+        finally:
+            seconds = time.perf_counter() - start
+            _record(_statements, sql, seconds, calls=0)
+            _record_nested(seconds)
+
+    def execute(self, sql, parameters=()):
+        self._sql = sql
+        _record(_statements, sql, 0.0)
+        return self._timed(sql, super().execute, sql, parameters)
+
+    def executemany(self, sql, seq_of_parameters):
+        self._sql = sql
+        _record(_statements, sql, 0.0)
+        return self._timed(sql, super().executemany, sql, seq_of_parameters)
+
+    def fetchone(self):
+        return self._timed(self._sql, super().fetchone)
+
+    def fetchmany(self, size=None):
+        return self._timed(self._sql, super().fetchmany, size or self.arraysize)
+
+    def fetchall(self):
+        return self._timed(self._sql, super().fetchall)
+
+    def __next__(self):
+        return self._timed(self._sql, super().__next__)
+
+
+class TracedConnection(sqlite3.Connection):
+    """Connection whose execute shortcuts go through a TracedCursor."""
+
+    def cursor(self, factory=TracedCursor):
+        return super().cursor(factory)
+
+    def execute(self, sql, parameters=()):
+        return self.cursor().execute(sql, parameters)
+
+    def executemany(self, sql, seq_of_parameters):
+        return self.cursor().executemany(sql, seq_of_parameters)
+
+
+def get_report(command: str = "") -> dict:
+    """Returns the collected timings as a JSON-serializable dict."""
+    statements = sorted(_statements.items(), key=lambda item: item[1][1], reverse=True)
+    return {
+        'command': command,
+        'phases': {name: {'calls': calls, 'seconds': seconds, 'self_seconds': self_seconds}
+                   for name, (calls, seconds, self_seconds)
+                   in sorted(_phases.items(), key=lambda item: item[1][2], reverse=True)},
+        'queries': {
+            'count': sum(calls for calls, _ in _statements.values()),
+            'seconds': sum(seconds for _, seconds in _statements.values()),
+            'statements': [{'sql': " ".join(sql.split()), 'count': calls, 'seconds': seconds}
+                           for sql, (calls, seconds) in statements],
+        },
+        'notes': list(_notes),
+    }
+
+def print_report(report: dict, top: int = 5):
+    """
+    Prints a per-phase breakdown and the slowest SQL statements to stderr.
+    'self ms' leaves out nested phases and SQL, so that column (plus the sql row) adds up.
+    """
+    queries = report['queries']
+    sql_ms = queries['seconds'] * 1000
+    lines = [f"Profile: {report['command']}".rstrip(),
+             f"  {'phase':<40} {'calls':>7} {'total ms':>10} {'self ms':>10}",
+             f"  {'sql':<40} {queries['count']:>7} {sql_ms:>10.2f} {sql_ms:>10.2f}"]
+    for name, entry in report['phases'].items():
+        lines.append(f"  {name:<40} {entry['calls']:>7} {entry['seconds'] * 1000:>10.2f} "
+                     f"{entry['self_seconds'] * 1000:>10.2f}")
+    if queries['statements']:
+        lines.append("  slowest statements:")
+        for statement in queries['statements'][:top]:
+            sql = statement['sql'] if len(statement['sql']) <= 70 else statement['sql'][:67] + "..."
+            lines.append(f"    {statement['count']:>5}x {statement['seconds'] * 1000:>9.2f} ms  {sql}")
+    for message in report['notes']:
+        lines.append(f"  note: {message}")
+    print("\n".join(lines), file=sys.stderr)
+
+def dump_trace(report: dict):
+    """Writes the report as JSON where HABIT_TRACE points (a file, or stderr for '1' / '-')."""
+    target = os.environ.get(TRACE_ENV_VAR, "")
+    line = json.dumps(report)
+    if target in ("1", "-"):
+        print(line, file=sys.stderr)
+    elif target:
+        with open(target, "a") as f:
+            f.write(line + "\n")
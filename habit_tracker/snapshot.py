@@ -0,0 +1,73 @@
+"""
+On-disk cache of computed stats, so read-only commands can skip the database scans.
+
+The cache file sits next to the database and holds one snapshot: the results of
+logic functions keyed by name, all valid for one (write count, day) pair. Any
+committed write bumps the database's write counter and a new day changes streaks
+and 'done today', so either one invalidates the whole snapshot.
+It is stored with marshal: compact, fast to load and limited to plain values,
+so loading a cache file can never run code.
+"""
+import marshal
+import os
+
+from . import db_manager, profiling
+
+# Bumped whenever the layout of the cached values changes
+CACHE_FORMAT = 2
+
+# A value that was not found in the cache (None is a valid cached value)
+MISSING = object()
+
+# The snapshot last read or written by this process: (validity, entries)
+_snapshot = None
+
+
+def cache_path():
+    """Returns the stats cache file of the current database, e.g. ~/.habit-cli/habits.stats.cache."""
+    return db_manager.DB_PATH.with_name(db_manager.DB_PATH.stem + ".stats.cache")
+
+def _load(validity: tuple) -> dict:
+    """Returns the cached entries if the cache file matches `validity`, otherwise an empty dict."""
+    global _snapshot
+    if _snapshot is not None and _snapshot[0] == validity:
+        return _snapshot[1]
+
+    entries = {}
+    try:
+        cache_format, cached_validity, cached_entries = marshal.loads(cache_path().read_bytes())
+        if cache_format == CACHE_FORMAT and cached_validity == validity:
+            entries = cached_entries
+    except (OSError, EOFError, ValueError, TypeError):
+        pass # No cache yet, or one written by another Python version: start over
+    _snapshot = (validity, entries)
+    return entries
+
+def lookup(key: tuple, validity: tuple):
+    """Returns the cached value for key, or MISSING."""
+    return _load(validity).get(key, MISSING)
+
+def store(key: tuple, value, validity: tuple):
+    """
+    Adds a value to the snapshot for `validity` and rewrites the cache file atomically.
+    Values marshal cannot serialize (e.g. dates) are left uncached, noted under --profile.
+    """
+    entries = dict(_load(validity))
+    entries[key] = value
+    try:
+        data = marshal.dumps((CACHE_FORMAT, validity, entries))
+    except ValueError as error:
+        profiling.note(f"snapshot: {key!r} left uncached ({error})")
+        return
+
+    path = cache_path()
+    temp_path = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+    try:
+        temp_path.write_bytes(data)
+        os.replace(temp_path, path)
+    except OSError:
+        temp_path.unlink(missing_ok=True) # A read-only home just means no cache
+        return
+
+    global _snapshot
+    _snapshot = (validity, entries)
@@ -0,0 +1,67 @@
+import csv
+import json
+import sys
+from contextlib import contextmanager
+
+from .db_manager import TRANSFER_COLUMNS
+
+FORMATS = ('csv', 'jsonl')
+
+
+def detect_format(path: str, fmt: str | None = None) -> str:
+    """Returns the explicit format, or guesses it from the file extension (CSV by default)."""
+    if fmt:
+        return fmt
+    return 'jsonl' if str(path).lower().endswith(('.jsonl', '.ndjson')) else 'csv'
+
+@contextmanager
+def open_file(path: str, mode: str):
+    """Opens path for reading ('r') or writing ('w') as CSV-safe text; '-' means stdin/stdout."""
+    if path == "-":
+        yield sys.stdin if mode == "r" else sys.stdout
+        return
+    with open(path, mode, encoding="utf-8", newline="") as f:
+        yield f
+
+def read_records(file, fmt: str):
+    """
+    Yields one TRANSFER_COLUMNS dict per CSV row or JSON line, reading the file lazily.
+    JSON lines must be objects whose TRANSFER_COLUMNS are strings (or null).
+    """
+    if fmt == 'csv':
+        yield from csv.DictReader(file)
+        return
+
+    for line_number, line in enumerate(file, start=1):
+        if not line.strip():
+            continue
+        try:
+            record = json.loads(line)
+        except json.JSONDecodeError as error:
+            raise ValueError(f"Invalid JSON on line {line_number}: {error}") from error
+        if not isinstance(record, dict):
+            raise ValueError(f"Expected a JSON object on line {line_number}, got {type(record).__name__}")
+        for column in TRANSFER_COLUMNS:
+            if not isinstance(record.get(column), (str, type(None))):
+                raise ValueError(f"Expected '{column}' to be a string on line {line_number}, "
+                                 f"got {record[column]!r}")
+        yield record
+
+def write_records(file, rows, fmt: str) -> int:
+    """
+    Writes TRANSFER_COLUMNS tuples as CSV (with a header) or JSON lines, one at a time.
+    :return: The number of rows written.
+    """
+    count = 0
+    if fmt == 'csv':
+        writer = csv.writer(file)
+        writer.writerow(TRANSFER_COLUMNS)
+        for row in rows:
+            writer.writerow(row)
+            count += 1
+        return count
+
+    for row in rows:
+        file.write(json.dumps(dict(zip(TRANSFER_COLUMNS, row))) + "\n")
+        count += 1
+    return count
@@ -0,0 +1,46 @@
+import random
+from datetime import date, timedelta
+
+from habit_tracker import db_manager, logic
+from habit_tracker.history import CompletionHistory
+
+
+def test_sql_analytics_match_python_streaks(tmp_path):
+    """get_habit_analytics agrees with the Python and bitset streaks on random histories."""
+    rng = random.Random(4)
+    today = date.today()
+    own_database = db_manager.DB_PATH
+    db_manager.set_db_path(tmp_path / "habits.db")
+    try:
+        db_manager.init_db()
+        histories = {}
+        with db_manager.db_session() as conn:
+            for number in range(200):
+                created = today - timedelta(days=rng.randint(0, 400))
+                density = rng.choice((0.0, 0.05, 0.5, 0.9, 1.0))
+                # Let some histories stop short of today, yesterday or a while ago
+                last = today - timedelta(days=rng.choice((0, 0, 1, 2, 30)))
+                days = [created + timedelta(days=offset) for offset in range((last - created).days + 1)
+                        if rng.random() < density]
+                cursor = conn.execute("INSERT INTO habits (name, created_at) VALUES (?, ?)",
+                                      (f"Habit {number}", f"{created.isoformat()} 08:00:00"))
+                conn.executemany("INSERT INTO completions (habit_id, completed_at) VALUES (?, ?)",
+                                 [(cursor.lastrowid, day.isoformat()) for day in days])
+                histories[cursor.lastrowid] = (created, days)
+
+        analytics = db_manager.get_habit_analytics(status='all', today=today)
+        for habit_id, (created, days) in histories.items():
+            newest_first = sorted(days, reverse=True)
+            history = CompletionHistory.from_dates(days, created)
+            expected = (len(days), logic.calculate_streak(newest_first), logic.calculate_longest_streak(days))
+            assert (len(history), history.current_streak(today), history.longest_streak()) == expected
+
+            row = analytics.get(habit_id)
+            if not days:
+                assert row is None
+                continue
+            assert (row['total_completions'], row['current_streak'], row['longest_streak']) == expected
+            assert row['first_completion'] == min(days).isoformat()
+            assert row['last_completion'] == max(days).isoformat()
+    finally:
+        db_manager.set_db_path(own_database)
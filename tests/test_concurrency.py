@@ -0,0 +1,15 @@
+import pytest
+
+from habit_tracker import benchmark, db_manager
+
+
+@pytest.mark.parametrize('defer', [False, True], ids=['direct', 'deferred'])
+def test_concurrent_writes_lose_nothing(tmp_path, defer):
+    """Completions written from many processes at once are all stored exactly once."""
+    own_database = db_manager.DB_PATH
+    try:
+        result = benchmark.run_stress(tmp_path / "habits.db", processes=8, writes=50, defer=defer)
+    finally:
+        db_manager.set_db_path(own_database)
+    assert (result['lost'], result['duplicated'], result['errors'], result['stats_mismatches']) == (0, 0, 0, 0)
+    assert result['stored'] == result['expected']
@@ -0,0 +1,45 @@
+import shutil
+import sqlite3
+from datetime import date, datetime
+from pathlib import Path
+
+from habit_tracker import db_manager
+
+# The unversioned (v0) database shipped with the repository
+SHIPPED_DATABASE = Path(__file__).resolve().parent.parent / "db" / "habits.db"
+
+
+def test_migrate_shipped_v0_database(tmp_path):
+    """An existing v0 database is backed up and upgraded to SCHEMA_VERSION with its data intact."""
+    path = tmp_path / "habits.db"
+    shutil.copy(SHIPPED_DATABASE, path)
+    with sqlite3.connect(path) as conn:
+        assert conn.execute("PRAGMA user_version").fetchone()[0] == 0
+        habits = conn.execute("SELECT id, created_at FROM habits ORDER BY id").fetchall()
+        completions = conn.execute("SELECT habit_id, completed_at FROM completions ORDER BY id").fetchall()
+    conn.close()
+
+    own_database = db_manager.DB_PATH
+    db_manager.set_db_path(path)
+    try:
+        db_manager.init_db()
+        conn = db_manager.get_db_connection()
+        assert db_manager.get_schema_version() == db_manager.SCHEMA_VERSION
+
+        for row in conn.execute("SELECT created_at, created_day FROM habits"):
+            assert row['created_day'] == datetime.fromisoformat(row['created_at']).date().toordinal()
+        for row in conn.execute("SELECT completed_at, completed_day FROM completions"):
+            assert row['completed_day'] == date.fromisoformat(row['completed_at']).toordinal()
+        assert [tuple(row) for row in conn.execute("SELECT id, created_at FROM habits ORDER BY id")] == habits
+
+        stats = {row['habit_id']: row['total_completions'] for row in conn.execute("SELECT * FROM habit_stats")}
+        assert stats == {habit_id: sum(1 for owner, _ in completions if owner == habit_id)
+                         for habit_id, _ in habits}
+        assert db_manager.rebuild_habit_stats() == []
+    finally:
+        db_manager.set_db_path(own_database)
+
+    with sqlite3.connect(tmp_path / "habits.db.v0.bak") as backup:
+        assert backup.execute("PRAGMA user_version").fetchone()[0] == 0
+        assert backup.execute("SELECT habit_id, completed_at FROM completions ORDER BY id").fetchall() == completions
+    backup.close()
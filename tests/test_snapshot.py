@@ -0,0 +1,23 @@
+from datetime import date
+
+from habit_tracker import benchmark, db_manager, logic, snapshot
+from habit_tracker.cli import SUMMARY_TERMINAL_FIELDS
+
+
+def test_terminal_summary_round_trips_through_snapshot(tmp_path, monkeypatch):
+    """The terminal summary is written to the snapshot cache file and read back unchanged."""
+    own_database = db_manager.DB_PATH
+    benchmark.generate_database(tmp_path / "habits.db", habits=20, years=0.5)
+    monkeypatch.setattr(logic, '_snapshot_cache', True)
+    monkeypatch.setattr(snapshot, '_snapshot', None)
+    try:
+        summary = logic.get_summary_data(fields=SUMMARY_TERMINAL_FIELDS)
+        validity = (db_manager.get_write_count(), date.today().toordinal())
+        key = ('summary', tuple(SUMMARY_TERMINAL_FIELDS), logic.DEFAULT_HEATMAP_RANGE)
+
+        # Forget the in-process copy so that the lookup has to read the cache file
+        monkeypatch.setattr(snapshot, '_snapshot', None)
+        assert snapshot.cache_path().exists()
+        assert snapshot.lookup(key, validity) == summary
+    finally:
+        db_manager.set_db_path(own_database)
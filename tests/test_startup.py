@@ -0,0 +1,33 @@
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+
+# Generous bound on a cold 'habit done': catches an eager heavy import, not noise
+MAX_STARTUP_SECONDS = 1.0
+
+
+def _run(*args, env):
+    return subprocess.run([sys.executable, *args], cwd=ROOT, env=env, capture_output=True, text=True, check=True)
+
+def test_cli_import_skips_report_libraries():
+    """Importing the CLI must not pull in rich or jinja2; only the commands that render use them."""
+    result = _run("-c", "import sys, habit_tracker.cli; print(sorted({'rich', 'jinja2'} & set(sys.modules)))",
+                  env=os.environ)
+    assert result.stdout.strip() == "[]"
+
+def test_cold_done_is_fast(tmp_path):
+    """A cold 'habit done' against an existing database stays within MAX_STARTUP_SECONDS."""
+    env = dict(os.environ, HABIT_DB=str(tmp_path / "habits.db"), HABIT_NO_DAEMON="1", HOME=str(tmp_path))
+    _run("-m", "habit_tracker", "add", "Walk", env=env)
+
+    result = _run("-m", "habit_tracker", "--startup-profile", "done", "1", "-q", env=env)
+    timings = {}
+    for line in result.stderr.splitlines():
+        phase, _, milliseconds = line.partition(":")
+        if milliseconds.strip().endswith("ms"):
+            timings[phase.strip()] = float(milliseconds.split()[0]) / 1000
+    assert set(timings) == {'imports', 'init_db', 'command'}
+    assert sum(timings.values()) < MAX_STARTUP_SECONDS